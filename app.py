@@ -1,7 +1,72 @@
 import streamlit as st
 import pandas as pd
-import json
+import io
+import os
+import hashlib
+import csv
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from modulos import resumo_geral, graficos_linha
+from modulos.cache_analise import analisar_em_cache
+from modulos.valores_ideais import carregar_valores_ideais, obter_faixas
+
+CAMINHO_VALORES_IDEAIS = "valores_ideais.json"
+
+# Colunas lidas pelas análises exibidas, tiradas das constantes dos próprios
+# módulos (uma coluna nova em um deles entra na leitura sem mexer aqui); as
+# demais nem chegam a ser convertidas na leitura
+COLUNAS_UTILIZADAS = frozenset().union(
+    resumo_geral.ORDEM_RESUMO,
+    graficos_linha.CAMPOS_GRAFICOS,
+    [graficos_linha.COLUNA_TEMPO],
+)
+
+# Marcadores de leitura vazia convertidos para NaN já na leitura do CSV
+VALORES_NULOS = ["-", "NA", "N/A", "NaN", "nan"]
+
+def detectar_separador(amostra: bytes) -> str:
+    """Detecta o separador do CSV a partir de uma amostra inicial do arquivo."""
+    try:
+        texto = amostra.decode("utf-8", errors="ignore")
+        return csv.Sniffer().sniff(texto, delimiters=";,\t|").delimiter
+    except csv.Error:
+        return ";"
+
+@st.cache_data(show_spinner=False)
+def carregar_csv(conteudo: bytes) -> pd.DataFrame:
+    """
+    Lê o CSV enviado; o cache é indexado pelo conteúdo do arquivo.
+    Usa o leitor C do pandas (um BOM UTF-8 no início é descartado pelo parser).
+    Só as colunas em COLUNAS_UTILIZADAS são convertidas, e "-" (leitura vazia da
+    ECU) já vira NaN no parser, então as colunas numéricas chegam como float e
+    sanitizar_coluna não precisa passar por texto. Floats ficam em float64
+    (em float32 os valores arredondados para exibição mudam em empates como
+    0.985); int64 vira int32 quando cabe (time(ms) em int32 cobre ~24 dias
+    de log sem perda). As linhas saem ordenadas por time(ms), premissa das
+    janelas posicionais (início/fim do log) e dos gráficos de linha.
+    """
+    separador = detectar_separador(conteudo[:4096])  # autodetecta separador
+    df = pd.read_csv(
+        io.BytesIO(conteudo), sep=separador, engine="c", low_memory=False,
+        usecols=lambda c: c in COLUNAS_UTILIZADAS, na_values=VALORES_NULOS,
+    )
+    tipos = {}
+    limites = np.iinfo(np.int32)
+    for c in df.select_dtypes("int64").columns:
+        if df[c].min() >= limites.min and df[c].max() <= limites.max:
+            tipos[c] = np.int32
+    df = df.astype(tipos)
+
+    # Logs já vêm em ordem na prática: a checagem é O(n) e só ordena se preciso
+    tempo = df.get("time(ms)")
+    if tempo is not None and pd.api.types.is_numeric_dtype(tempo) and not tempo.is_monotonic_increasing:
+        df = df.sort_values("time(ms)", kind="mergesort", ignore_index=True)
+    return df
+
+@st.cache_resource
+def carregar_valores_ideais_cache(caminho: str, mtime: float) -> dict:
+    """Carrega o JSON de valores ideais uma única vez por versão do arquivo (mtime)."""
+    return carregar_valores_ideais(caminho)
 
 # --- Configuração inicial ---
 st.set_page_config(page_title="Analisador de Dados OBD", layout="wide")
@@ -13,8 +78,9 @@ uploaded_file = st.file_uploader("Selecione o arquivo .csv exportado da ECU", ty
 
 # --- Carregar os valores ideais ---
 try:
-    with open("valores_ideais.json", "r", encoding="utf-8") as f:
-        valores_ideais = json.load(f)
+    valores_ideais = carregar_valores_ideais_cache(
+        CAMINHO_VALORES_IDEAIS, os.path.getmtime(CAMINHO_VALORES_IDEAIS)
+    )
     modelos_disponiveis = list(valores_ideais.keys())
 except Exception as e:
     st.error(f"Erro ao carregar valores ideais: {e}")
@@ -31,7 +97,9 @@ if not uploaded_file:
 
 # --- Leitura e pré-visualização do CSV ---
 try:
-    df = pd.read_csv(uploaded_file, sep=None, engine="python")  # autodetecta separador
+    conteudo = uploaded_file.getvalue()
+    assinatura_df = hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+    df = carregar_csv(conteudo)
     st.success("Arquivo CSV carregado com sucesso!")
     st.write("Prévia dos dados:", df.head())
 except Exception as e:
@@ -41,12 +109,30 @@ except Exception as e:
 # --- Executar análises ---
 st.header("3. Análises de Sensores")
 
+# Faixas do modelo/combustível resolvidas uma única vez para todos os módulos
+faixas = obter_faixas(valores_ideais, modelo, combustivel)
+
+# O resumo e a preparação dos gráficos são independentes e o trabalho pesado
+# roda em código C do pandas/NumPy, então executam em paralelo; a exibição fica
+# na thread principal e uma falha aparece só no expander da análise que falhou.
+with ThreadPoolExecutor(max_workers=2) as executor:
+    futuro_resumo = executor.submit(
+        analisar_em_cache, "resumo_geral", assinatura_df, df, modelo, combustivel, valores_ideais, faixas
+    )
+    futuro_graficos = executor.submit(graficos_linha.preparar_dados_em_cache, assinatura_df, df)
+
 with st.expander("🔎 RESUMO_GERAL"):
-    resultado = resumo_geral.analisar(df, modelo, combustivel, valores_ideais)
-    resumo_geral.exibir(resultado)
+    try:
+        resumo_geral.exibir(futuro_resumo.result())
+    except Exception as e:
+        st.error(f"Erro na análise resumo_geral: {e}")
 
 with st.expander("📈 GRAFICOS_LINHA"):
-    graficos_linha.exibir(df)
+    try:
+        futuro_graficos.result()  # já em cache: exibir reaproveita os dados preparados
+        graficos_linha.exibir(df, assinatura_df)
+    except Exception as e:
+        st.error(f"Erro nos gráficos de linha: {e}")
 
 st.success("✅ Análise concluída.")
 
@@ -1,35 +1,111 @@
 # modulos/analise_completa.py
 # Continuação do arquivo: modulos/analise_completa.py
-import json
+import orjson
+from collections import Counter
 import streamlit as st
 import pandas as pd
 import numpy as np
-
-def estatisticas_numericas(serie: pd.Series) -> dict:
-    """Calcula estatísticas detalhadas para uma série numérica."""
+from modulos.utilitarios import calcular_quantis, formatar_valor, mais_frequentes
+
+# Parâmetros do detector "sigma limit" em janela móvel
+JANELA_ANOMALIA = 50
+SIGMA_ANOMALIA = 3.0
+# Ruído gaussiano já passa de 3σ em ~0,3% das leituras (um pouco mais com o
+# desvio estimado em 50 amostras): só acima desta fração a coluna é marcada
+TAXA_MINIMA_ANOMALIA = 0.01
+
+# Colunas analisadas por analisar_dataframe_completo
+COLUNAS_ANALISE = [
+    "time(ms)", "IC_SPDMTR(km/h)", "RPM(1/min)", "ODOMETER(km)", "TRIP_ODOM(km)",
+    "ENGI_IDLE", "OPENLOOP", "BOO_ABS", "ENG_STAB", "FUELLVL(%)", "FUELPW(ms)",
+    "FUEL_CORR(:1)", "AF_LEARN", "SHRTFT1(%)", "LONGFT1(%)", "AF_RATIO(:1)",
+    "LMD_EGO1(:1)", "O2S11_V(V)", "ECT_GAUGE(Â°C)", "ECT(Â°C)", "IAT(Â°C)", 
+    "MAP(V)", "MAP.OBDII(kPa)", "MIXCNT_STAT", "LAMBDA_1", "SPKDUR_1(ms)",
+    "SPKDUR_2(ms)", "SPKDUR_3(ms)", "SPKDUR_4(ms)", "LF_WSPD(km/h)", 
+    "RF_WSPD(km/h)", "LR_WSPD(km/h)", "RR_WSPD(km/h)", "VBAT_1(V)", 
+    "BRK_LVL", "FUEL_RESER", "PSP", "FANLO", "FANHI", "ANY_DR_AJ", "T_AJAR"
+]
+
+def estatisticas_numericas_lote(df_num: pd.DataFrame) -> dict:
+    """
+    Calcula mín, média, máx, mediana, desvio padrão e quartis de todas as
+    colunas numéricas de uma vez (reduções do pandas sobre o bloco inteiro).
+    Retorna {coluna: estatísticas}.
+    """
+    if df_num.shape[1] == 0:
+        return {}
+
+    num = df_num.astype(np.float64)
+    agregados = num.agg(["min", "mean", "max"])
+
+    # Quartis e mediana por seleção parcial, sem ordenar cada coluna inteira
+    quantis = np.full((3, num.shape[1]), np.nan)
+    for j, arr in enumerate(num.to_numpy().T):
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            quantis[:, j] = calcular_quantis(arr, [0.25, 0.5, 0.75])
+
+    tabela = pd.DataFrame({
+        "min": agregados.loc["min"],
+        "media": agregados.loc["mean"],
+        "max": agregados.loc["max"],
+        "mediana": quantis[1],
+        "desvio_padrao": num.std(ddof=0),
+        "q1": quantis[0],
+        "q3": quantis[2],
+    })
     return {
-        "min": float(serie.min()),
-        "media": float(serie.mean()),
-        "max": float(serie.max()),
-        "mediana": float(serie.median()),
-        "desvio_padrao": float(serie.std(ddof=0)),
-        "q1": float(serie.quantile(0.25)),
-        "q3": float(serie.quantile(0.75)),
+        coluna: {k: float(v) for k, v in stats.items()}
+        for coluna, stats in tabela.to_dict("index").items()
     }
 
 def top3_valores(serie: pd.Series) -> list:
     """
     Retorna os 3 valores mais frequentes com porcentagem de aparição.
-    Para numéricos, arredonda em 2 casas.
+    Para numéricos, arredonda em 2 casas (contagem em mais_frequentes).
+    NaN ficam fora da contagem e do total, como no value_counts(normalize=True).
     """
+    serie = serie.dropna()
+    total = len(serie)
+    if total == 0:
+        return []
+
     if pd.api.types.is_numeric_dtype(serie):
-        serie = serie.round(2)
-    contagem = serie.value_counts(normalize=True).head(3) * 100
+        valores, contagens = mais_frequentes(serie.to_numpy())
+        mais_comuns = zip(valores.tolist(), contagens.tolist())
+    elif isinstance(serie.dtype, pd.CategoricalDtype):
+        # Contagem direta sobre os códigos inteiros da categoria
+        contagens = np.bincount(serie.cat.codes.to_numpy(), minlength=len(serie.cat.categories))
+        idx = np.argsort(-contagens, kind="stable")[:3]
+        idx = idx[contagens[idx] > 0]
+        mais_comuns = zip(serie.cat.categories[idx].tolist(), contagens[idx].tolist())
+    else:
+        mais_comuns = Counter(serie).most_common(3)
+
     return [
-        {"valor": val, "percentual": round(freq, 2)}
-        for val, freq in zip(contagem.index.tolist(), contagem.values.tolist())
+        {"valor": val, "percentual": round(freq / total * 100, 2)}
+        for val, freq in mais_comuns
     ]
 
+def normalizar_categorias(serie: pd.Series) -> pd.Series:
+    """
+    Converte a série para categórica com rótulos em minúsculas e sem espaços.
+    A normalização roda sobre as categorias distintas, não sobre cada linha.
+    NaN continua NaN.
+    """
+    categorica = serie.astype("category")
+    normalizadas = categorica.cat.categories.astype(str).str.strip().str.lower()
+    unicas = normalizadas.unique()
+    # Código -1 (NaN) aponta para o -1 acrescentado no fim, e não para a
+    # última categoria; também cobre a série só com NaN (sem categorias)
+    mapa = np.append(unicas.get_indexer(normalizadas), -1)
+    codigos = mapa[categorica.cat.codes.to_numpy()]
+    return pd.Series(
+        pd.Categorical.from_codes(codigos, categories=unicas),
+        index=serie.index,
+        name=serie.name,
+    )
+
 def detectar_comportamento_numerico(serie: pd.Series, valores_esp: list | None) -> list:
     """
     Detecta comportamentos suspeitos para sensores numéricos:
@@ -37,13 +113,17 @@ def detectar_comportamento_numerico(serie: pd.Series, valores_esp: list | None)
     - Tempo dentro/fora da faixa esperada
     """
     comportamento = []
+    arr = serie.to_numpy(dtype=np.float64, copy=False)
 
-    if serie.std(ddof=0) < 0.01:
+    if arr.size and arr.std() < 0.01:
         comportamento.append("Pouca variação (sensor possivelmente travado)")
 
     if valores_esp and isinstance(valores_esp, (list, tuple)) and len(valores_esp) == 2:
         faixa_min, faixa_max = valores_esp
-        dentro = serie.between(faixa_min, faixa_max).mean() * 100
+        if arr.size:
+            dentro = np.count_nonzero((arr >= faixa_min) & (arr <= faixa_max)) / arr.size * 100
+        else:
+            dentro = float("nan")
         if dentro < 75:
             comportamento.append(f"Só {dentro:.1f}% dentro da faixa ideal")
         else:
@@ -51,6 +131,25 @@ def detectar_comportamento_numerico(serie: pd.Series, valores_esp: list | None)
 
     return comportamento
 
+def detectar_anomalias_janela(df_num: pd.DataFrame, janela: int = JANELA_ANOMALIA,
+                              sigma: float = SIGMA_ANOMALIA) -> dict:
+    """
+    Detector de anomalias "sigma limit" em janela móvel, para todas as colunas
+    numéricas de uma vez: marca leituras que se afastam mais de `sigma` desvios
+    da média das `janela` leituras anteriores. Trechos sem variação (desvio 0)
+    não são marcados. Retorna {coluna: quantidade de leituras anômalas}; quem
+    chama compara a fração com TAXA_MINIMA_ANOMALIA antes de apontar a coluna.
+    """
+    if df_num.shape[1] == 0:
+        return {}
+
+    num = df_num.astype(np.float64)
+    anteriores = num.shift(1).rolling(janela, min_periods=janela)
+    media = anteriores.mean()
+    desvio = anteriores.std(ddof=0)
+    anomalias = ((num - media).abs() > sigma * desvio) & (desvio > 0)
+    return anomalias.sum().astype(int).to_dict()
+
 def detectar_comportamento_categorico(serie: pd.Series, valores_esp: list | None) -> list:
     """Analisa colunas categóricas para observações úteis."""
     observacoes = [f"{len(serie.unique())} valores distintos detectados"]
@@ -75,20 +174,19 @@ def analisar_dataframe_completo(df: pd.DataFrame, valores_ideais: dict | None =
         valores_ideais = {}
 
     resultado = {}
+    colunas = COLUNAS_ANALISE
+    presentes = set(df.columns)  # um único hash das colunas para todos os testes abaixo
 
-    colunas = [
-        "time(ms)", "IC_SPDMTR(km/h)", "RPM(1/min)", "ODOMETER(km)", "TRIP_ODOM(km)",
-        "ENGI_IDLE", "OPENLOOP", "BOO_ABS", "ENG_STAB", "FUELLVL(%)", "FUELPW(ms)",
-        "FUEL_CORR(:1)", "AF_LEARN", "SHRTFT1(%)", "LONGFT1(%)", "AF_RATIO(:1)",
-        "LMD_EGO1(:1)", "O2S11_V(V)", "ECT_GAUGE(Â°C)", "ECT(Â°C)", "IAT(Â°C)", 
-        "MAP(V)", "MAP.OBDII(kPa)", "MIXCNT_STAT", "LAMBDA_1", "SPKDUR_1(ms)",
-        "SPKDUR_2(ms)", "SPKDUR_3(ms)", "SPKDUR_4(ms)", "LF_WSPD(km/h)", 
-        "RF_WSPD(km/h)", "LR_WSPD(km/h)", "RR_WSPD(km/h)", "VBAT_1(V)", 
-        "BRK_LVL", "FUEL_RESER", "PSP", "FANLO", "FANHI", "ANY_DR_AJ", "T_AJAR"
+    # Estatísticas de todas as colunas numéricas em uma única passada
+    colunas_numericas = [
+        c for c in colunas
+        if c in presentes and pd.api.types.is_numeric_dtype(df[c])
     ]
+    stats_numericas = estatisticas_numericas_lote(df[colunas_numericas])
+    anomalias = detectar_anomalias_janela(df[colunas_numericas])
 
     for coluna in colunas:
-        if coluna not in df.columns:
+        if coluna not in presentes:
             resultado[coluna] = {
                 "status": "sem_dados",
                 "mensagem": f"Coluna '{coluna}' não encontrada no DataFrame."
@@ -99,12 +197,18 @@ def analisar_dataframe_completo(df: pd.DataFrame, valores_ideais: dict | None =
 
         # Detecta se é numérica ou categórica
         if pd.api.types.is_numeric_dtype(serie):
-            # Estatísticas numéricas
-            stats = estatisticas_numericas(serie)
+            # Estatísticas numéricas (pré-calculadas em lote)
+            stats = stats_numericas[coluna]
             top3 = top3_valores(serie)
 
             faixa_ideal = valores_ideais.get(coluna, None)
             comportamento = detectar_comportamento_numerico(serie, faixa_ideal)
+            taxa_anomalia = anomalias.get(coluna, 0) / len(serie) if len(serie) else 0.0
+            if taxa_anomalia > TAXA_MINIMA_ANOMALIA:
+                comportamento.append(
+                    f"{anomalias[coluna]} leituras ({taxa_anomalia:.1%}) fora de {SIGMA_ANOMALIA:g}σ "
+                    f"da média móvel ({JANELA_ANOMALIA} amostras)"
+                )
 
             resultado[coluna] = {
                 "tipo": "numerico",
@@ -116,7 +220,7 @@ def analisar_dataframe_completo(df: pd.DataFrame, valores_ideais: dict | None =
 
         else:
             # Campos categóricos
-            serie = serie.astype(str).str.strip().str.lower()
+            serie = normalizar_categorias(serie)
             top3 = top3_valores(serie)
 
             valores_esp = valores_ideais.get(coluna, None)
@@ -137,14 +241,14 @@ def exportar_json(resultado: dict, caminho_arquivo: str = "analise_completa.json
     Exporta o dicionário de análise completa para um arquivo JSON legível.
     """
     try:
-        with open(caminho_arquivo, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, ensure_ascii=False, indent=4)
+        with open(caminho_arquivo, "wb") as f:
+            f.write(orjson.dumps(resultado, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         return True
     except Exception as e:
         print(f"Erro ao exportar JSON: {e}")
         return False
 
-def analisar(df, modelo=None, combustivel=None, valores_ideais=None):
+def analisar(df, modelo=None, combustivel=None, valores_ideais=None, faixas=None):
     """Alias para manter compatibilidade com o app principal."""
     return analisar_dataframe_completo(df, valores_ideais)
 
@@ -178,9 +282,9 @@ def exibir_streamlit(resultado: dict):
 
             # Estatísticas básicas em 3 colunas
             c1, c2, c3 = st.columns(3)
-            c1.metric("Média", f"{estat.get('media', 'N/A'):.2f}" if estat.get("media") is not None else "N/A")
-            c2.metric("Mínimo", f"{estat.get('minimo', 'N/A'):.2f}" if estat.get("minimo") is not None else "N/A")
-            c3.metric("Máximo", f"{estat.get('maximo', 'N/A'):.2f}" if estat.get("maximo") is not None else "N/A")
+            c1.metric("Média", formatar_valor(estat.get("media")))
+            c2.metric("Mínimo", formatar_valor(estat.get("min")))
+            c3.metric("Máximo", formatar_valor(estat.get("max")))
 
             # Top 3 valores
             if top3:
@@ -0,0 +1,19 @@
+# modulos/cache_analise.py
+
+import importlib
+import pandas as pd
+import streamlit as st
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=64)
+def analisar_em_cache(nome_modulo: str, assinatura_df: str, _df: pd.DataFrame, modelo: str, combustivel: str,
+                      valores_ideais: dict, faixas: dict | None = None):
+    """
+    Executa `modulos.<nome_modulo>.analisar` memorizando o resultado.
+    O DataFrame (`_df`) fica fora do hash do Streamlit: ele é identificado pela
+    `assinatura_df` (digest do arquivo enviado, do qual o df é função), o que
+    evita re-hashear todas as linhas a cada rerun. Modelo, combustível e valores
+    ideais também entram na chave. `max_entries` limita a memória a poucos
+    uploads (cada upload gera uma entrada por módulo de análise).
+    """
+    modulo = importlib.import_module(f"modulos.{nome_modulo}")
+    return modulo.analisar(_df, modelo, combustivel, valores_ideais, faixas)
@@ -1,7 +1,11 @@
 # modulos/combustivel_avancado.py
 
+import re
+from functools import lru_cache
+import numpy as np
 import streamlit as st
 from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas
+from modulos.valores_ideais import obter_faixas
 
 # Campos de mistura suportados (sem LAMBDA_1)
 CAMPOS_MISTURA = {
@@ -11,7 +15,18 @@ CAMPOS_MISTURA = {
     "LMD_EGO1(:1)": "Lambda estimado pelo sensor O2 pré-catalisador."
 }
 
-def analisar(df, modelo, combustivel, valores_ideais):
+# Normalização nome da coluna -> chave do JSON: tokens de unidade via regex,
+# caracteres avulsos via tabela de tradução (uma passada cada)
+_UNIDADES = {"(%)": "pct", "(:1)": ""}
+_RE_UNIDADES = re.compile(r"\(%\)|\(:1\)")
+_TRADUCAO_CHAVE = str.maketrans({".": "_", ":": ""})
+
+@lru_cache(maxsize=None)
+def chave_json(coluna: str) -> str:
+    """Converte o nome da coluna do CSV para a chave usada no valores_ideais.json."""
+    return _RE_UNIDADES.sub(lambda m: _UNIDADES[m.group()], coluna).translate(_TRADUCAO_CHAVE)
+
+def analisar(df, modelo, combustivel, valores_ideais, faixas=None):
     """
     Analisa parâmetros de mistura com métricas detalhadas:
     - Estatísticas básicas
@@ -19,9 +34,8 @@ def analisar(df, modelo, combustivel, valores_ideais):
     - Picos máximos e mínimos
     """
     resultados = []
-    modelo_key = modelo.lower()
-    combustivel_key = combustivel.lower()
-    faixas_modelo = valores_ideais.get(modelo_key, {}).get(combustivel_key, {})
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
 
     for coluna, descricao in CAMPOS_MISTURA.items():
         serie = sanitizar_coluna(df, coluna)
@@ -40,13 +54,7 @@ def analisar(df, modelo, combustivel, valores_ideais):
         estat = calcular_estatisticas(serie)
 
         # Faixa ideal do JSON
-        chave_json = (
-            coluna.replace("(%)", "pct")
-                  .replace("(:1)", "")
-                  .replace(".", "_")
-                  .replace(":", "")
-        )
-        faixa = faixas_modelo.get(chave_json)
+        faixa = faixas.get(chave_json(coluna))
         faixa_ideal = None
         if faixa and isinstance(faixa, list) and len(faixa) == 2:
             faixa_ideal = {"min": faixa[0], "max": faixa[1]}
@@ -54,10 +62,11 @@ def analisar(df, modelo, combustivel, valores_ideais):
         # Cálculos avançados: tempo dentro/fora da faixa
         dentro, abaixo, acima = None, None, None
         if faixa_ideal:
-            total = len(serie)
-            dentro = ((serie >= faixa_ideal["min"]) & (serie <= faixa_ideal["max"])).sum() / total * 100
-            abaixo = (serie < faixa_ideal["min"]).sum() / total * 100
-            acima = (serie > faixa_ideal["max"]).sum() / total * 100
+            # Uma única passada classifica cada leitura em abaixo/dentro/acima
+            arr = serie.to_numpy(dtype=np.float64, copy=False)
+            limites = [faixa_ideal["min"], np.nextafter(faixa_ideal["max"], np.inf)]
+            contagens = np.bincount(np.digitize(arr, limites), minlength=3)
+            abaixo, dentro, acima = contagens * 100.0 / arr.size
             status = "OK" if dentro >= 80 else "Alerta"
             mensagem = (
                 f"{coluna}: {dentro:.1f}% dentro da faixa "
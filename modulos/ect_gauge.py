@@ -1,7 +1,8 @@
 import streamlit as st
 from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status, interpretar_status
+from modulos.valores_ideais import obter_faixas
 
-def analisar(df, modelo, combustivel, valores_ideais):
+def analisar(df, modelo, combustivel, valores_ideais, faixas=None):
     """
     Analisa a coluna ECT_GAUGE(°C) do DataFrame:
     - Limpeza dos dados
@@ -26,12 +27,9 @@ def analisar(df, modelo, combustivel, valores_ideais):
     # Busca faixa ideal no JSON
     faixa_ideal = {"min": 80, "max": 100}  # fallback
     try:
-        faixa = (
-            valores_ideais
-            .get(modelo.lower(), {})
-            .get(combustivel.lower(), {})
-            .get("ECT_GAUGE")
-        )
+        if faixas is None:
+            faixas = obter_faixas(valores_ideais, modelo, combustivel)
+        faixa = faixas.get("ECT_GAUGE")
         if faixa and isinstance(faixa, list) and len(faixa) == 2:
             faixa_ideal = {"min": faixa[0], "max": faixa[1]}
     except Exception:
@@ -0,0 +1,76 @@
+# modulos/fuel_trim.py
+# Implementação comum dos módulos shrtft1 (curto prazo) e longft1 (longo prazo)
+
+import streamlit as st
+from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status, interpretar_status
+from modulos.valores_ideais import obter_faixas
+
+def analisar_trim(df, coluna, chave_faixa, modelo, combustivel, valores_ideais, faixas=None):
+    """
+    Analisa uma coluna de correção de combustível (SHRTFT1/LONGFT1) do DataFrame:
+    - Limpeza dos dados
+    - Cálculo de estatísticas
+    - Comparação com a faixa `chave_faixa` dos valores ideais
+    """
+    # Sanitiza a coluna antes de qualquer cálculo
+    serie = sanitizar_coluna(df, coluna)
+    if serie.empty:
+        return {
+            "status": "erro",
+            "titulo": coluna,
+            "mensagem": f"Sem dados válidos para '{coluna}'.",
+            "valores": {}
+        }
+
+    # Calcula estatísticas básicas
+    estatisticas = calcular_estatisticas(serie)
+
+    # Busca faixa ideal no JSON de valores
+    faixa_ideal = {"min": -100, "max": 100}  # fallback
+    try:
+        if faixas is None:
+            faixas = obter_faixas(valores_ideais, modelo, combustivel)
+        faixa = faixas.get(chave_faixa)
+        if faixa and isinstance(faixa, list) and len(faixa) == 2:
+            faixa_ideal = {"min": faixa[0], "max": faixa[1]}
+    except Exception:
+        pass
+
+    # Avalia status com base na média
+    status = avaliar_status(estatisticas["média"], faixa_ideal)
+    mensagem = interpretar_status(coluna, status)
+
+    return {
+        "status": status,
+        "titulo": coluna,
+        "mensagem": mensagem,
+        "valores": {
+            **estatisticas,
+            "faixa_ideal": faixa_ideal
+        }
+    }
+
+def exibir_trim(resultado: dict):
+    """
+    Exibe o resultado de analisar_trim no Streamlit
+    """
+    st.markdown(f"### 🔍 {resultado['titulo']}")
+
+    if resultado["status"] == "erro":
+        st.error(resultado["mensagem"])
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Média", f"{resultado['valores']['média']}%")
+    col2.metric("Mínimo", f"{resultado['valores']['mínimo']}%")
+    col3.metric("Máximo", f"{resultado['valores']['máximo']}%")
+
+    # Exibe status interpretativo
+    if resultado["status"] == "OK":
+        st.success(resultado["mensagem"])
+    else:
+        st.warning(f"⚠️ {resultado['mensagem']}")
+
+    # Mostra faixa ideal
+    faixa = resultado["valores"]["faixa_ideal"]
+    st.caption(f"Faixa ideal: {faixa['min']}% a {faixa['max']}%")
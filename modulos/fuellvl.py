@@ -1,76 +1,90 @@
 # modulos/fuellvl.py
 
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import streamlit as st
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.utilitarios import (
+    sanitizar_colunas, calcular_estatisticas_lote, avaliar_status, formatar_valor, tabela_estatisticas
+)
+from modulos.valores_ideais import obter_faixas
 
 VOLUME_TANQUE = 55.0  # Litros
 
 # Aliases para nomes de colunas que podem variar
 COLUNAS_EQUIVALENTES = {
-    "FUELLVL(%)": ["FUELLVL(%)", "FUEL_LVL(%)", "FUELLEVEL(%)"],
-    "TRIP_ODOM(km)": ["TRIP_ODOM(km)", "TRIP(km)"],
-    "ODOMETER(km)": ["ODOMETER(km)", "ODO(km)"],
-    "IC_SPDMTR(km/h)": ["IC_SPDMTR(km/h)", "SPEED(km/h)"],
-    "ENGI_IDLE": ["ENGI_IDLE", "IDLE"],
-    "AF_RATIO(:1)": ["AF_RATIO(:1)", "AFR(:1)"],
-    "SHRTFT1(%)": ["SHRTFT1(%)", "STFT1(%)"],
-    "LONGFT1(%)": ["LONGFT1(%)", "LTFT1(%)"],
-    "LAMBDA_1": ["LAMBDA_1", "LAMBDA"],
-    "LMD_EGO1(:1)": ["LMD_EGO1(:1)", "EGO(:1)"],
-    "LOAD.OBDII(%)": ["LOAD.OBDII(%)", "LOAD(%)"],
-    "TP.OBDII(%)": ["TP.OBDII(%)", "TPS(%)"],
-    "ECT_GAUGE(Â°C)": ["ECT_GAUGE(Â°C)", "ECT(°C)"],
-    "IAT(Â°C)": ["IAT(Â°C)", "IAT(°C)"],
-    "VBAT_1(V)": ["VBAT_1(V)", "VBAT(V)"]
+    "FUELLVL(%)": ("FUELLVL(%)", "FUEL_LVL(%)", "FUELLEVEL(%)"),
+    "TRIP_ODOM(km)": ("TRIP_ODOM(km)", "TRIP(km)"),
+    "ODOMETER(km)": ("ODOMETER(km)", "ODO(km)"),
+    "IC_SPDMTR(km/h)": ("IC_SPDMTR(km/h)", "SPEED(km/h)"),
+    "ENGI_IDLE": ("ENGI_IDLE", "IDLE"),
+    "AF_RATIO(:1)": ("AF_RATIO(:1)", "AFR(:1)"),
+    "SHRTFT1(%)": ("SHRTFT1(%)", "STFT1(%)"),
+    "LONGFT1(%)": ("LONGFT1(%)", "LTFT1(%)"),
+    "LAMBDA_1": ("LAMBDA_1", "LAMBDA"),
+    "LMD_EGO1(:1)": ("LMD_EGO1(:1)", "EGO(:1)"),
+    "LOAD.OBDII(%)": ("LOAD.OBDII(%)", "LOAD(%)"),
+    "TP.OBDII(%)": ("TP.OBDII(%)", "TPS(%)"),
+    "ECT_GAUGE(Â°C)": ("ECT_GAUGE(Â°C)", "ECT(°C)"),
+    "IAT(Â°C)": ("IAT(Â°C)", "IAT(°C)"),
+    "VBAT_1(V)": ("VBAT_1(V)", "VBAT(V)")
 }
 
-def get_col(df, colname):
-    """Retorna a primeira coluna existente do DataFrame que corresponde aos aliases."""
-    for alias in COLUNAS_EQUIVALENTES.get(colname, [colname]):
-        if alias in df.columns:
-            return alias
-    return None
+# Colunas (nomes canônicos) convertidas para número em lote no analisar
+COLUNAS_NUMERICAS = [
+    "FUELLVL(%)", "TRIP_ODOM(km)", "ODOMETER(km)", "AF_RATIO(:1)", "SHRTFT1(%)",
+    "LONGFT1(%)", "LAMBDA_1", "LMD_EGO1(:1)", "LOAD.OBDII(%)", "TP.OBDII(%)",
+    "ECT_GAUGE(Â°C)", "IAT(Â°C)", "VBAT_1(V)"
+]
+
+@lru_cache(maxsize=8)
+def _resolver_colunas(colunas: tuple) -> dict:
+    """Mapeia cada nome canônico para o primeiro alias presente nas colunas (ou None)."""
+    presentes = set(colunas)  # hash único; `in` na tupla seria uma busca linear por alias
+    return {
+        nome: next((alias for alias in aliases if alias in presentes), None)
+        for nome, aliases in COLUNAS_EQUIVALENTES.items()
+    }
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     resultado = {
         "status": "OK",
         "mensagem": "",
         "valores": {}
     }
 
-    # --- Identificar colunas principais ---
-    fuellvl_col = get_col(df, "FUELLVL(%)")
-    trip_col = get_col(df, "TRIP_ODOM(km)")
-    odo_col = get_col(df, "ODOMETER(km)")
-    speed_col = get_col(df, "IC_SPDMTR(km/h)")
-    idle_col = get_col(df, "ENGI_IDLE")
-
-    # --- Sanitização ---
-    fuellvl = sanitizar_coluna(df, fuellvl_col) if fuellvl_col else pd.Series(dtype=float)
-    trip_odom = sanitizar_coluna(df, trip_col) if trip_col else pd.Series(dtype=float)
-    odometer = sanitizar_coluna(df, odo_col) if odo_col else pd.Series(dtype=float)
-
-    engi_idle = df.get(idle_col, pd.Series(dtype=str)).astype(str).str.lower().replace({
-        "sim": 1, "não": 0, "nao": 0, "nÃ£o": 0,
-        "yes": 1, "no": 0, "-": 0, "": 0
-    })
-    engi_idle = pd.to_numeric(engi_idle, errors="coerce").fillna(0).astype(int)
+    # --- Identificar colunas principais (aliases resolvidos uma vez por conjunto de colunas) ---
+    colunas = _resolver_colunas(tuple(df.columns))
+    fuellvl_col = colunas["FUELLVL(%)"]
+    if fuellvl_col is None:
+        # Sem nível de combustível não há consumo a calcular: sai antes de sanitizar o resto
+        resultado["status"] = "erro"
+        resultado["mensagem"] = "Coluna de nível de combustível (FUELLVL(%)) não encontrada."
+        return resultado
+    trip_col = colunas["TRIP_ODOM(km)"]
+    odo_col = colunas["ODOMETER(km)"]
+
+    # --- Sanitização (todas as colunas numéricas em um único lote) ---
+    series = sanitizar_colunas(df, [colunas[nome] for nome in COLUNAS_NUMERICAS if colunas[nome]])
+    vazia = pd.Series(dtype=float)
+    fuellvl = series.get(fuellvl_col, vazia)
+    trip_odom = series.get(trip_col, vazia)
+    odometer = series.get(odo_col, vazia)
 
     # --- Mistura ---
-    af_ratio = sanitizar_coluna(df, get_col(df, "AF_RATIO(:1)"))
-    shrtft1 = sanitizar_coluna(df, get_col(df, "SHRTFT1(%)"))
-    longft1 = sanitizar_coluna(df, get_col(df, "LONGFT1(%)"))
-    lambda1 = sanitizar_coluna(df, get_col(df, "LAMBDA_1"))
-    ego = sanitizar_coluna(df, get_col(df, "LMD_EGO1(:1)"))
+    af_ratio = series.get(colunas["AF_RATIO(:1)"], vazia)
+    shrtft1 = series.get(colunas["SHRTFT1(%)"], vazia)
+    longft1 = series.get(colunas["LONGFT1(%)"], vazia)
+    lambda1 = series.get(colunas["LAMBDA_1"], vazia)
+    ego = series.get(colunas["LMD_EGO1(:1)"], vazia)
 
     # --- Contexto do motor ---
-    load = sanitizar_coluna(df, get_col(df, "LOAD.OBDII(%)"))
-    tps = sanitizar_coluna(df, get_col(df, "TP.OBDII(%)"))
-    ect = sanitizar_coluna(df, get_col(df, "ECT_GAUGE(Â°C)"))
-    iat = sanitizar_coluna(df, get_col(df, "IAT(Â°C)"))
-    vbat = sanitizar_coluna(df, get_col(df, "VBAT_1(V)"))
+    load = series.get(colunas["LOAD.OBDII(%)"], vazia)
+    tps = series.get(colunas["TP.OBDII(%)"], vazia)
+    ect = series.get(colunas["ECT_GAUGE(Â°C)"], vazia)
+    iat = series.get(colunas["IAT(Â°C)"], vazia)
+    vbat = series.get(colunas["VBAT_1(V)"], vazia)
 
     # --- Cálculo de viagem ---
     tempo_total_seg = None
@@ -78,17 +92,18 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
         tempo_total_seg = (df["time(ms)"].max() - df["time(ms)"].min()) / 1000.0
 
     if not trip_odom.empty:
-        distancia_km = trip_odom.max() - trip_odom.min()
+        distancia_km = np.ptp(trip_odom.to_numpy(dtype=np.float64, copy=False))
     elif not odometer.empty:
-        distancia_km = odometer.max() - odometer.min()
+        distancia_km = np.ptp(odometer.to_numpy(dtype=np.float64, copy=False))
     else:
         distancia_km = None
 
     consumo_litros = None
     consumo_pct = None
     if not fuellvl.empty:
-        inicio = fuellvl.head(10).mean()
-        fim = fuellvl.tail(10).mean()
+        fuel_arr = fuellvl.to_numpy(dtype=np.float64, copy=False)
+        inicio = fuel_arr[:10].mean()
+        fim = fuel_arr[-10:].mean()
         consumo_pct = max(inicio - fim, 0)
         consumo_litros = round(consumo_pct / 100.0 * VOLUME_TANQUE, 2)
 
@@ -96,10 +111,15 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     if distancia_km and consumo_litros and consumo_litros > 0:
         kml = round(distancia_km / consumo_litros, 2)
 
-    # --- Estatísticas ---
-    def stats_or_none(serie):
-        stats = calcular_estatisticas(serie)
-        return {k: (float(v) if v is not None else None) for k, v in stats.items()}
+    # --- Estatísticas (todas as séries em uma única agregação) ---
+    grupos = {
+        "mistura": {"AF_RATIO": af_ratio, "SHRTFT1": shrtft1, "LONGFT1": longft1, "Lambda": lambda1, "EGO": ego},
+        "motor": {"LOAD": load, "TPS": tps, "ECT": ect, "IAT": iat, "VBAT": vbat}
+    }
+    estatisticas = calcular_estatisticas_lote({n: s for g in grupos.values() for n, s in g.items()})
+
+    def stats_or_none(nome):
+        return {k: (float(v) if v is not None else None) for k, v in estatisticas[nome].items()}
 
     resultado["valores"] = {
         "consumo_litros": consumo_litros,
@@ -107,37 +127,28 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
         "distancia_km": distancia_km,
         "kml": kml,
         "tempo_total_seg": tempo_total_seg,
-        "mistura": {
-            "AF_RATIO": stats_or_none(af_ratio),
-            "SHRTFT1": stats_or_none(shrtft1),
-            "LONGFT1": stats_or_none(longft1),
-            "Lambda": stats_or_none(lambda1),
-            "EGO": stats_or_none(ego)
-        },
-        "motor": {
-            "LOAD": stats_or_none(load),
-            "TPS": stats_or_none(tps),
-            "ECT": stats_or_none(ect),
-            "IAT": stats_or_none(iat),
-            "VBAT": stats_or_none(vbat)
-        }
+        **{grupo: {nome: stats_or_none(nome) for nome in series_grupo} for grupo, series_grupo in grupos.items()}
     }
 
     # --- Avaliação ---
     status_msgs = []
-    faixas = valores_ideais.get(modelo, {}).get(combustivel, {})
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
 
     if kml is not None and "consumo_minimo_kml" in faixas:
         if kml < faixas["consumo_minimo_kml"]:
             status_msgs.append(f"⚠️ Consumo médio {kml} km/L abaixo do ideal ({faixas['consumo_minimo_kml']} km/L)")
             resultado["status"] = "alerta"
 
-    for campo, stats in resultado["valores"]["mistura"].items():
-        if stats["média"] is None:
-            continue
-        faixa = faixas.get(campo)
-        if faixa and not (faixa[0] <= stats["média"] <= faixa[1]):
-            status_msgs.append(f"{campo} médio {stats['média']} fora da faixa {faixa}")
+    # Checagem de faixa vetorizada: uma comparação para todos os campos com média e faixa
+    mistura = resultado["valores"]["mistura"]
+    campos = [c for c, stats in mistura.items() if stats["média"] is not None and faixas.get(c)]
+    if campos:
+        medias = np.array([mistura[c]["média"] for c in campos])
+        limites = np.array([faixas[c][:2] for c in campos], dtype=np.float64)
+        for i in np.flatnonzero((medias < limites[:, 0]) | (medias > limites[:, 1])):
+            campo = campos[i]
+            status_msgs.append(f"{campo} médio {mistura[campo]['média']} fora da faixa {faixas[campo]}")
             resultado["status"] = "alerta"
 
     if not status_msgs:
@@ -156,19 +167,16 @@ def exibir(resultado: dict):
     kml = valores.get("kml")
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("Distância (km)", f"{distancia_km:.2f}" if distancia_km else "N/A")
-    col2.metric("Consumo (L)", f"{consumo_litros:.2f}" if consumo_litros else "N/A")
-    col3.metric("Consumo Médio (km/L)", f"{kml:.2f}" if kml else "N/A")
+    col1.metric("Distância (km)", formatar_valor(distancia_km))
+    col2.metric("Consumo (L)", formatar_valor(consumo_litros))
+    col3.metric("Consumo Médio (km/L)", formatar_valor(kml))
 
+    # Uma tabela por grupo (um único elemento enviado ao front-end) em vez de um st.write por parâmetro
     st.markdown("### 🔹 Mistura e Correções de Combustível")
-    for key, stats in valores.get("mistura", {}).items():
-        if stats["média"] is not None:
-            st.write(f"**{key}** — Média: {stats['média']:.2f}, Mín: {stats['mínimo']}, Máx: {stats['máximo']}")
+    st.dataframe(tabela_estatisticas(valores.get("mistura", {})), use_container_width=True)
 
     st.markdown("### 🔹 Parâmetros do Motor")
-    for key, stats in valores.get("motor", {}).items():
-        if stats["média"] is not None:
-            st.write(f"**{key}** — Média: {stats['média']:.2f}, Mín: {stats['mínimo']}, Máx: {stats['máximo']}")
+    st.dataframe(tabela_estatisticas(valores.get("motor", {})), use_container_width=True)
 
     if resultado["status"] == "alerta":
         st.warning(resultado["mensagem"])
@@ -2,8 +2,10 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.valores_ideais import obter_faixas
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa a coluna FUELPW(ms) - tempo de abertura dos injetores.
     Retorna estatísticas e status com base em valores ideais.
@@ -21,17 +23,18 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     # Estatísticas básicas
     estat = calcular_estatisticas(serie)
 
-    # Detecta picos de injeção acima de 2x a média
-    picos = serie[serie > (estat["média"] * 2)]
-    pico_max = float(picos.max()) if not picos.empty else None
+    # Detecta picos de injeção acima de 2x a média (reduções direto no array,
+    # sem montar uma Series com os picos)
+    arr = serie.to_numpy()
+    limiar = estat["média"] * 2
+    acima = arr > limiar
+    n_picos = int(np.count_nonzero(acima))
+    pico_max = float(np.max(arr, where=acima, initial=limiar)) if n_picos else None
 
     # Avaliação do status
-    faixa_ideal = (
-        valores_ideais
-        .get(modelo, {})
-        .get(combustivel, {})
-        .get(coluna, {})
-    )
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
+    faixa_ideal = faixas.get(coluna, {})
     status = avaliar_status(estat["média"], faixa_ideal)
 
     # Mensagem interpretativa
@@ -52,7 +55,7 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
         "valores": {
             "estatisticas": estat,
             "pico_max": pico_max,
-            "picos_detectados": int(len(picos)),
+            "picos_detectados": n_picos,
         }
     }
 
@@ -2,11 +2,12 @@
 # Módulo: graficos_linha.py
 # =========================
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
-# Lista de campos que terão gráfico
-CAMPOS_GRAFICOS = [
+# Campos que terão gráfico (tupla: imutável e usável como chave de cache)
+CAMPOS_GRAFICOS = (
     "IC_SPDMTR(km/h)",
     "RPM(1/min)",
     "FUELLVL(%)",
@@ -16,39 +17,118 @@ CAMPOS_GRAFICOS = [
     "LMD_EGO1(:1)",
     "ECT_GAUGE(°C)",
     "ECT(°C)"
-]
+)
 
-def exibir(df: pd.DataFrame):
+# Coluna de tempo (ms) usada no eixo x
+COLUNA_TEMPO = "time(ms)"
+
+# Acima deste número de amostras cada série é reduzida para ~PONTOS_ALVO_GRAFICO
+MAX_PONTOS_GRAFICO = 4000
+PONTOS_ALVO_GRAFICO = 2000
+
+def reduzir_pontos(tempo: np.ndarray, valores: np.ndarray, max_pontos: int = PONTOS_ALVO_GRAFICO):
+    """
+    Reduz uma série longa para o gráfico mantendo, em cada balde de amostras
+    consecutivas, o ponto de mínimo e o de máximo (picos continuam visíveis,
+    ao contrário da decimação por passo fixo). Tudo vetorizado com NumPy.
+    """
+    n = valores.size
+    if n <= max_pontos:
+        return tempo, valores
+
+    passo = -(-n // (max_pontos // 2))  # divisão arredondando para cima
+    baldes = n // passo
+    blocos = valores[:baldes * passo].reshape(baldes, passo)
+    inicio = np.arange(baldes) * passo
+    nulos = np.isnan(blocos)
+    pos_min = np.argmin(np.where(nulos, np.inf, blocos), axis=1) + inicio
+    pos_max = np.argmax(np.where(nulos, -np.inf, blocos), axis=1) + inicio
+    posicoes = np.unique(np.concatenate([pos_min, pos_max, np.arange(baldes * passo, n)]))
+    return tempo[posicoes], valores[posicoes]
+
+def preparar_dados(df: pd.DataFrame) -> tuple[list, list, pd.DataFrame]:
+    """
+    Monta os dados dos gráficos: retorna (campos ausentes, campos sem dados
+    numéricos, DataFrame longo tempo/sensor/valor já reduzido). Espera a
+    coluna 'time(ms)' presente.
+    """
+    # Converter tempo para segundos (plotado direto, sem copiar o DataFrame)
+    tempo_segundos = pd.to_numeric(df[COLUNA_TEMPO], errors="coerce") / 1000
+
+    # Uma única passada separa os campos presentes dos ausentes
+    colunas = set(df.columns)
+    presentes = [campo for campo in CAMPOS_GRAFICOS if campo in colunas]
+    ausentes = [campo for campo in CAMPOS_GRAFICOS if campo not in colunas]
+
+    # Converter para numérico uma única vez, ignorando valores inválidos;
+    # colunas já numéricas (caso comum após o carregamento) passam direto
+    numericos = pd.DataFrame({
+        campo: df[campo] if pd.api.types.is_numeric_dtype(df[campo])
+        else pd.to_numeric(df[campo], errors="coerce")
+        for campo in presentes
+    })
+    sem_dados = [campo for campo in presentes if not numericos[campo].notna().any()]
+
+    # Séries longas viram ~PONTOS_ALVO_GRAFICO pontos (mín/máx por balde): o
+    # navegador não distingue mais que isso e o payload do Plotly encolhe na
+    # mesma proporção (as estatísticas continuam usando os dados completos)
+    tempo = tempo_segundos.to_numpy(dtype=np.float64)
+    reduzir = len(numericos) > MAX_PONTOS_GRAFICO
+    partes = []
+    for campo in presentes:
+        if campo in sem_dados:
+            continue
+        valores = numericos[campo].to_numpy(dtype=np.float64)
+        t, v = reduzir_pontos(tempo, valores) if reduzir else (tempo, valores)
+        partes.append(pd.DataFrame({"tempo": t, "sensor": campo, "valor": v}))
+    longo = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    return ausentes, sem_dados, longo
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=8)
+def preparar_dados_em_cache(assinatura_df: str, _df: pd.DataFrame) -> tuple[list, list, pd.DataFrame]:
+    """
+    preparar_dados memorizado por upload: como em analisar_em_cache, o df fica
+    fora do hash e é identificado pela assinatura do arquivo, então os reruns
+    (cliques em outros widgets) reaproveitam tempo, conversão e redução.
+    """
+    return preparar_dados(_df)
+
+def exibir(df: pd.DataFrame, assinatura_df: str | None = None):
     """Exibe gráficos de linha para os campos definidos."""
     st.subheader("📈 Gráficos de Linha dos Sensores")
 
-    if "time(ms)" not in df.columns:
+    if COLUNA_TEMPO not in df.columns:
         st.error("A coluna 'time(ms)' não foi encontrada no arquivo. Não é possível gerar gráficos de linha.")
         return
 
-    # Converter tempo para segundos
-    tempo_segundos = pd.to_numeric(df["time(ms)"], errors="coerce") / 1000
-    df_graficos = df.copy()
-    df_graficos["Tempo (s)"] = tempo_segundos
+    if assinatura_df is not None:
+        ausentes, sem_dados, longo = preparar_dados_em_cache(assinatura_df, df)
+    else:
+        ausentes, sem_dados, longo = preparar_dados(df)
 
-    for campo in CAMPOS_GRAFICOS:
-        if campo not in df.columns:
-            st.warning(f"Coluna '{campo}' ausente no arquivo CSV.")
-            continue
+    for campo in ausentes:
+        st.warning(f"Coluna '{campo}' ausente no arquivo CSV.")
+    for campo in sem_dados:
+        st.warning(f"Sem dados numéricos válidos para '{campo}'.")
 
-        # Converter para numérico, ignorando valores inválidos
-        serie = pd.to_numeric(df[campo], errors="coerce")
-        if serie.dropna().empty:
-            st.warning(f"Sem dados numéricos válidos para '{campo}'.")
-            continue
+    # Campos válidos vão para uma única figura com um painel por sensor
+    validos = [campo for campo in CAMPOS_GRAFICOS if campo not in ausentes and campo not in sem_dados]
+    if not validos:
+        return
 
-        # Criar gráfico
-        fig = px.line(
-            df_graficos,
-            x="Tempo (s)",
-            y=campo,
-            title=f"{campo} ao longo do tempo",
-            labels={"Tempo (s)": "Tempo (segundos)", campo: campo},
-            template="plotly_white"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    # Criar gráfico (um payload só; cada painel mantém sua escala no eixo y)
+    fig = px.line(
+        longo,
+        x="tempo",
+        y="valor",
+        facet_row="sensor",
+        category_orders={"sensor": validos},
+        height=200 * len(validos),
+        title="Sensores ao longo do tempo",
+        labels={"tempo": "Tempo (segundos)", "valor": ""},
+        template="plotly_white",
+        render_mode="webgl"  # traços scattergl: a GPU desenha as linhas, não o SVG
+    )
+    fig.update_yaxes(matches=None)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+    st.plotly_chart(fig, use_container_width=True)
@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.utilitarios import (
+    sanitizar_coluna, sanitizar_colunas, calcular_estatisticas_lote, avaliar_status, tabela_estatisticas
+)
+from modulos.valores_ideais import obter_faixas
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa mistura ar/combustível e sensores lambda:
     - AF_RATIO(:1)
@@ -15,17 +19,18 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     status_geral = "OK"
     mensagens = []
 
+    # Sanitização e estatísticas de todas as colunas em lote
+    series = sanitizar_colunas(df, colunas)
+    estatisticas = calcular_estatisticas_lote(series)
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
+
     # --- Análise de cada coluna ---
     for coluna in colunas:
-        serie = sanitizar_coluna(df, coluna)
-        estat = calcular_estatisticas(serie)
-
-        faixa_ideal = (
-            valores_ideais
-            .get(modelo, {})
-            .get(combustivel, {})
-            .get(coluna, {})
-        )
+        serie = series[coluna]
+        estat = estatisticas[coluna]
+
+        faixa_ideal = faixas.get(coluna, {})
 
         status = avaliar_status(estat["média"], faixa_ideal)
         if status == "Alerta":
@@ -78,17 +83,18 @@ def exibir(resultado: dict):
     else:
         st.error(mensagem)
 
-    # Exibir estatísticas
+    # Exibir estatísticas (uma tabela para todos os sensores)
     valores = resultado.get("valores", {})
-    for coluna, dados in valores.items():
-        estat = dados.get("estatisticas", {})
-        st.markdown(f"**{coluna}** — Status: {dados.get('status','-')}")
-        if estat["média"] is not None:
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Média", estat["média"])
-            col2.metric("Mínimo", estat["mínimo"])
-            col3.metric("Máximo", estat["máximo"])
-
-        # Mostrar variação do O2
-        if coluna == "O2S11_V(V)" and "variacao" in dados:
-            st.caption(f"Variação do O2S11: {dados['variacao']} V")
+    if valores:
+        st.dataframe(
+            tabela_estatisticas(
+                {coluna: dados.get("estatisticas", {}) for coluna, dados in valores.items()},
+                status={coluna: dados.get("status", "-") for coluna, dados in valores.items()},
+            ),
+            use_container_width=True
+        )
+
+    # Mostrar variação do O2
+    dados_o2 = valores.get("O2S11_V(V)", {})
+    if "variacao" in dados_o2:
+        st.caption(f"Variação do O2S11: {dados_o2['variacao']} V")
@@ -1,8 +1,25 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.utilitarios import sanitizar_colunas, calcular_estatisticas_lote, avaliar_status, tabela_estatisticas
+from modulos.valores_ideais import obter_faixas
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def correlacao_pareada(a: pd.Series, b: pd.Series) -> float:
+    """
+    Correlação de Pearson entre as linhas presentes nas duas séries (mesmo
+    resultado de `a.corr(b)`), com o pareamento feito por np.intersect1d
+    sobre os índices em vez do alinhamento do pandas.
+    """
+    _, pos_a, pos_b = np.intersect1d(a.index, b.index, assume_unique=True, return_indices=True)
+    if pos_a.size < 2:
+        return np.nan
+    x = a.to_numpy(dtype=np.float64)[pos_a]
+    y = b.to_numpy(dtype=np.float64)[pos_b]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.corrcoef(x, y)[0, 1])
+
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa o sensor MAP (Manifold Absolute Pressure) em Volts e kPa.
     Verifica variação e consistência com as faixas ideais.
@@ -12,16 +29,17 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     mensagens = []
     status_geral = "OK"
 
+    # Sanitização e estatísticas de todas as colunas em lote
+    series = sanitizar_colunas(df, colunas)
+    estatisticas = calcular_estatisticas_lote(series)
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
+
     for coluna in colunas:
-        serie = sanitizar_coluna(df, coluna)
-        estat = calcular_estatisticas(serie)
-
-        faixa_ideal = (
-            valores_ideais
-            .get(modelo, {})
-            .get(combustivel, {})
-            .get(coluna, {})
-        )
+        serie = series[coluna]
+        estat = estatisticas[coluna]
+
+        faixa_ideal = faixas.get(coluna, {})
 
         status = avaliar_status(estat["média"], faixa_ideal)
         if status == "Alerta":
@@ -44,12 +62,12 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
                 mensagens.append(f"{coluna}: média={estat['média']}, variação={round(variacao,2) if variacao else '-'}")
 
     # --- Checagem cruzada MAP em V e kPa ---
-    serie_volts = sanitizar_coluna(df, "MAP(V)")
-    serie_kpa = sanitizar_coluna(df, "MAP.OBDII(kPa)")
+    serie_volts = series["MAP(V)"]
+    serie_kpa = series["MAP.OBDII(kPa)"]
 
     correlacao = None
     if not serie_volts.empty and not serie_kpa.empty:
-        correlacao = serie_volts.corr(serie_kpa)
+        correlacao = correlacao_pareada(serie_volts, serie_kpa)
         if correlacao and correlacao < 0.8:
             mensagens.append("⚠️ MAP: baixa correlação entre V e kPa → possível problema no sensor ou conversão.")
             status_geral = "Alerta"
@@ -77,16 +95,16 @@ def exibir(resultado: dict):
     else:
         st.error(mensagem)
 
-    # Exibir estatísticas organizadas
+    # Exibir estatísticas organizadas (uma tabela para V e kPa)
     valores = resultado.get("valores", {})
-    for coluna, dados in valores.items():
-        estat = dados.get("estatisticas", {})
-        st.markdown(f"**{coluna}** — Status: {dados.get('status','-')}")
-        if estat.get("média") is not None:
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Média", estat["média"])
-            col2.metric("Mínimo", estat["mínimo"])
-            col3.metric("Máximo", estat["máximo"])
+    if valores:
+        st.dataframe(
+            tabela_estatisticas(
+                {coluna: dados.get("estatisticas", {}) for coluna, dados in valores.items()},
+                status={coluna: dados.get("status", "-") for coluna, dados in valores.items()},
+            ),
+            use_container_width=True
+        )
 
     # Exibir correlação entre V e kPa
     correlacao = resultado.get("correlacao_V_kPa")
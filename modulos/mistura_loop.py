@@ -1,6 +1,7 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas
+from modulos.utilitarios import sanitizar_colunas, calcular_estatisticas_lote
 
 COLUNAS = [
     "MIXCNT_STAT",
@@ -10,7 +11,24 @@ COLUNAS = [
     "AF_LEARN"
 ]
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+# Rótulos textuais de OPENLOOP (já normalizados: strip + minúsculas)
+MAPA_OPENLOOP = {"sim": 1, "não": 0, "nao": 0, "true": 1, "false": 0}
+
+def closed_loop(serie: pd.Series) -> np.ndarray:
+    """
+    Máscara booleana das linhas em closed loop (OPENLOOP == 0; texto não
+    reconhecido e vazio contam como 0). A normalização e a conversão rodam
+    só sobre os valores distintos e são espalhadas pelos códigos do factorize.
+    """
+    codigos, distintos = pd.factorize(serie)
+    rotulos = pd.Index(distintos).astype(str).str.strip().str.lower()
+    valores = pd.Series([MAPA_OPENLOOP.get(r, r) for r in rotulos], dtype=object)
+    numericos = pd.to_numeric(valores, errors='coerce').fillna(0).astype(int)
+    fechado = np.append(numericos.to_numpy() == 0, True)  # código -1 (NaN) -> 0
+    return fechado[codigos]
+
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa o comportamento do controle de mistura e do loop da ECU.
     """
@@ -18,9 +36,13 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     mensagens = []
     status_geral = "OK"
 
+    # Séries numéricas sanitizadas e agregadas em lote
+    estatisticas = calcular_estatisticas_lote(
+        sanitizar_colunas(df, ["LAMBDA_1", "FUEL_CORR(:1)", "AF_LEARN"])
+    )
+
     # 1. Lambda
-    lambda_series = sanitizar_coluna(df, "LAMBDA_1")
-    estat_lambda = calcular_estatisticas(lambda_series)
+    estat_lambda = estatisticas["LAMBDA_1"]
     resultados["lambda"] = estat_lambda
     if estat_lambda["média"] is not None:
         if estat_lambda["média"] < 0.95 or estat_lambda["média"] > 1.05:
@@ -33,12 +55,8 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     openloop_col = df.get("OPENLOOP")
     closed_loop_pct = None
     if openloop_col is not None:
-        openloop_num = openloop_col.astype(str).str.strip().str.lower()
-        openloop_num = openloop_num.replace({
-            "sim": 1, "não": 0, "nao": 0, "true": 1, "false": 0
-        })
-        openloop_num = pd.to_numeric(openloop_num, errors='coerce').fillna(0).astype(int)
-        closed_loop_pct = round((openloop_num == 0).sum() / len(openloop_num) * 100, 2)
+        fechado = closed_loop(openloop_col)
+        closed_loop_pct = round(np.count_nonzero(fechado) / len(fechado) * 100, 2)
         resultados["closed_loop_%"] = closed_loop_pct
         mensagens.append(f"Closed Loop: {closed_loop_pct}% do tempo")
 
@@ -48,8 +66,7 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
 
     # 3. Fuel Corrections
     for coluna in ["FUEL_CORR(:1)", "AF_LEARN"]:
-        serie = sanitizar_coluna(df, coluna)
-        estat = calcular_estatisticas(serie)
+        estat = estatisticas[coluna]
         resultados[coluna] = estat
         if estat["média"] is not None:
             mensagens.append(f"{coluna} médio: {estat['média']}")
@@ -1,75 +1,163 @@
 # =========================
 # Imports e configuração
 # =========================
+import math
 import pandas as pd
 import numpy as np
 import streamlit as st
-from scipy.stats import mstats
-from scipy.ndimage import uniform_filter1d
+from modulos.utilitarios import calcular_quantis, mais_frequentes
 
-st.set_page_config(page_title="Análise de Dados OBD", layout="wide")
+# A configuração da página (st.set_page_config) fica só no app.py
+
+# =========================
+# Campos do resumo
+# =========================
+
+# Ordem em que os campos aparecem no resumo
+ORDEM_RESUMO = [
+    "time(ms)", "IC_SPDMTR(km/h)", "RPM(1/min)", "ODOMETER(km)", "TRIP_ODOM(km)",
+    "ENGI_IDLE", "OPENLOOP", "ENG_STAB", "FUELLVL(%)", "FUELPW(ms)",
+    "FUEL_CORR(:1)", "SHRTFT1(%)", "LONGFT1(%)", "AF_RATIO(:1)", "LMD_EGO1(:1)",
+    "O2S11_V(V)", "ECT_GAUGE(°C)", "ECT(°C)", "IAT(°C)", "MAP(V)", "MAP.OBDII(kPa)",
+    "MIXCNT_STAT", "LAMBDA_1", "SPKDUR_1(ms)", "SPKDUR_2(ms)", "SPKDUR_3(ms)",
+    "SPKDUR_4(ms)", "VBAT_1(V)", "BRK_LVL", "PSP", "FANLO", "FANHI"
+]
+
+# Campos numéricos resumidos por min/mediana/max/média winsorizada
+CAMPOS_NUMERICOS = [
+    "IC_SPDMTR(km/h)", "RPM(1/min)", "FUELPW(ms)", "FUEL_CORR(:1)", "SHRTFT1(%)",
+    "LONGFT1(%)", "AF_RATIO(:1)", "LMD_EGO1(:1)", "O2S11_V(V)", "ECT_GAUGE(°C)",
+    "ECT(°C)", "IAT(°C)", "MAP(V)", "MAP.OBDII(kPa)", "SPKDUR_1(ms)", "SPKDUR_2(ms)",
+    "SPKDUR_3(ms)", "SPKDUR_4(ms)", "VBAT_1(V)", "FANLO", "FANHI"
+]
+
+# Numéricos que também listam os 3 valores mais frequentes
+CAMPOS_TOP3 = frozenset({
+    "FUEL_CORR(:1)", "SHRTFT1(%)", "LONGFT1(%)", "AF_RATIO(:1)", "LMD_EGO1(:1)",
+    "MAP(V)", "MAP.OBDII(kPa)"
+})
+
+# Campos categóricos e os valores esperados de cada um
+CAMPOS_CATEGORICOS = {
+    "ENGI_IDLE": ["SIM", "NÃO"],
+    "OPENLOOP": ["ON", "OFF"],
+    "ENG_STAB": ["SIM", "NÃO"],
+    "MIXCNT_STAT": ["ABERTO", "FECHADO"],
+    "LAMBDA_1": ["LEAN MIX", "RICH MIX", "ETC"],
+    "BRK_LVL": ["ALTO", "MÉDIO", "BAIXO"],
+    "PSP": ["HIGH", "MEDIUM", "LOW"]
+}
 
 # =========================
 # Funções auxiliares de cálculo
 # =========================
 
-def winsorizada(serie: pd.Series, limite=0.05):
-    """Aplica winsorização para reduzir impacto de outliers."""
-    serie_clean = pd.to_numeric(serie, errors='coerce').dropna()
-    if serie_clean.empty:
-        return None
-    return pd.Series(mstats.winsorize(serie_clean, limits=limite))
+def _numerica(serie: pd.Series) -> pd.Series:
+    """pd.to_numeric + dropna, sem reconverter séries que já são numéricas."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.dropna()
+    return pd.to_numeric(serie, errors='coerce').dropna()
+
+def bloco_numerico(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas de `df` convertidas para float64 (inválidos viram NaN). Colunas
+    que já são float64 não são copiadas nem reconvertidas, então o bloco pode
+    ser montado uma vez e repassado a estatisticas_lote e top3_frequentes.
+    """
+    return pd.DataFrame({
+        coluna: (serie if pd.api.types.is_numeric_dtype(serie)
+                 else pd.to_numeric(serie, errors='coerce')).astype(np.float64, copy=False)
+        for coluna, serie in df.items()
+    })
+
+def estatisticas_lote(df: pd.DataFrame, limite=0.05) -> dict[str, dict]:
+    """
+    Calcula min, mediana, max e média winsorizada de todas as colunas de
+    `df` de uma vez: min/mediana/max saem de um único agg e a média
+    winsorizada de um np.sort por colunas (NaN vão para o fim) + clip com
+    limites por coluna, no lugar de uma conversão e uma winsorização por campo.
+    """
+    num = bloco_numerico(df)
+    if num.columns.empty:
+        return {}
+    validos = num.notna().sum().to_numpy()
+
+    # Mesmo corte do mstats.winsorize: int(limite*n) amostras de cada lado
+    if len(num):
+        ordenado = np.sort(num.to_numpy(), axis=0)
+        colunas = np.arange(num.shape[1])
+        k_baixo = (limite * validos).astype(np.intp)
+        k_alto = np.maximum(validos - k_baixo - 1, 0)
+        media_winsor = num.clip(ordenado[k_baixo, colunas], ordenado[k_alto, colunas], axis=1).mean()
+    else:
+        media_winsor = pd.Series(np.nan, index=num.columns)
+    agregado = num.agg(["min", "median", "max"])
 
-def estatisticas(serie: pd.Series) -> dict:
-    """Calcula min, mediana, max e média winsorizada."""
-    dados = pd.to_numeric(serie, errors='coerce').dropna()
-    if dados.empty:
-        return {
-            "min": None,
-            "mediana": None,
-            "max": None,
-            "media_winsorizada": None,
-            "mensagem": "Sem dados válidos"
+    resultado = {}
+    for i, coluna in enumerate(num.columns):
+        if validos[i] == 0:
+            resultado[coluna] = {
+                "min": None,
+                "mediana": None,
+                "max": None,
+                "media_winsorizada": None,
+                "mensagem": "Sem dados válidos"
+            }
+            continue
+        a = agregado[coluna]
+        resultado[coluna] = {
+            "min": arredondar_seguro(a["min"]),
+            "mediana": arredondar_seguro(a["median"]),
+            "max": arredondar_seguro(a["max"]),
+            "media_winsorizada": arredondar_seguro(media_winsor[coluna])
         }
-
-    winsor = winsorizada(dados)
-    return {
-        "min": arredondar_seguro(dados.min()),
-        "mediana": arredondar_seguro(dados.median()),
-        "max": arredondar_seguro(dados.max()),
-        "media_winsorizada": arredondar_seguro(winsor.mean()) if winsor is not None else None
-    }
+    return resultado
 
 def top3_frequentes(serie: pd.Series) -> list:
     """Retorna os 3 valores mais frequentes com percentual."""
-    dados = pd.to_numeric(serie, errors='coerce').dropna()
+    dados = _numerica(serie)
     if dados.empty:
         return []
-    freq = dados.round(2).value_counts(normalize=True).head(3) * 100
+    valores, contagens = mais_frequentes(dados.to_numpy(dtype=np.float64))
+    percentuais = contagens / len(dados) * 100
     return [
-        {"valor": k, "percentual": round(v, 2)} for k, v in freq.items()
+        {"valor": v, "percentual": round(p, 2)} for v, p in zip(valores, percentuais)
     ]
 
 def percentual_valores(serie: pd.Series, valores_esperados: list[str]) -> dict:
     """Calcula percentual de ocorrência de cada valor esperado."""
-    serie = serie.dropna().astype(str).str.upper()
-    total = len(serie)
+    # Conta os valores distintos uma vez e normaliza só os rótulos (poucos),
+    # em vez de converter/comparar cada linha para cada valor esperado; o "-"
+    # (leitura vazia) sai da contagem, sem máscara sobre a coluna inteira
+    contagem = serie.value_counts()
+    contagem = contagem[contagem.index != "-"]
+    contagem.index = contagem.index.astype(str).str.upper()
+    contagem = contagem.groupby(level=0).sum()
+    total = int(contagem.sum())
     resultado = {}
     for v in valores_esperados:
-        resultado[v] = round((serie == v).sum() / total * 100, 2) if total > 0 else 0.0
-    inesperados = set(serie.unique()) - set([v.upper() for v in valores_esperados])
+        resultado[v] = round(contagem.get(v, 0) / total * 100, 2) if total > 0 else 0.0
+    inesperados = set(contagem.index) - set([v.upper() for v in valores_esperados])
     if inesperados:
         resultado["Valores inesperados"] = list(inesperados)
     return resultado
 
 def arredondar_seguro(valor, casas=2):
-    """Arredonda sem quebrar quando valor é NaN."""
+    """Arredonda sem quebrar quando valor é NaN/inf ou não numérico."""
     try:
-        if pd.notna(valor):
-            return round(float(valor), casas)
-        return None
-    except:
+        valor = float(valor)
+    except (TypeError, ValueError):
         return None
+    return round(valor, casas) if math.isfinite(valor) else None
+
+def media_movel_5(arr: np.ndarray) -> np.ndarray:
+    """
+    Média móvel centrada de 5 amostras, repetindo as pontas (equivale ao
+    uniform_filter1d(size=5, mode="nearest") do scipy): soma acumulada e
+    diferença de janelas, sem o caminho genérico de filtro.
+    """
+    acumulado = np.concatenate(([0.0], np.cumsum(np.pad(arr, 2, mode="edge"))))
+    return (acumulado[5:] - acumulado[:-5]) / 5
 
 def analisar_fuellvl(df: pd.DataFrame, capacidade_tanque=55.0):
     """Analisa nível de combustível com winsorização + suavização."""
@@ -77,7 +165,7 @@ def analisar_fuellvl(df: pd.DataFrame, capacidade_tanque=55.0):
         return {"mensagem": "Coluna ausente"}
 
     # Converte para numérico
-    col = pd.to_numeric(df["FUELLVL(%)"], errors='coerce').dropna()
+    col = _numerica(df["FUELLVL(%)"])
     if col.empty:
         return {"mensagem": "Sem dados válidos"}
 
@@ -85,14 +173,16 @@ def analisar_fuellvl(df: pd.DataFrame, capacidade_tanque=55.0):
     if len(col) < 2:
         return {"mensagem": "Poucos dados para análise"}
 
-    # Winsoriza e suaviza
-    q_low = col.quantile(0.05)
-    q_high = col.quantile(0.95)
-    col_clip = col.clip(lower=q_low, upper=q_high)
-    col_suav = uniform_filter1d(col_clip.values, size=5, mode="nearest")
+    # Winsoriza e suaviza (direto no ndarray, sem Series intermediárias).
+    # Só as 10 primeiras/últimas amostras suavizadas são usadas e a janela de 5
+    # alcança 2 vizinhos, então basta suavizar 12 amostras em cada ponta
+    arr = col.to_numpy(dtype=np.float64, copy=False)
+    q_low, q_high = calcular_quantis(arr, [0.05, 0.95])
+    inicio = media_movel_5(np.clip(arr[:12], q_low, q_high))
+    final = media_movel_5(np.clip(arr[-12:], q_low, q_high))
 
-    ini_pct = np.mean(col_suav[:10])
-    fim_pct = np.mean(col_suav[-10:])
+    ini_pct = np.mean(inicio[:10])
+    fim_pct = np.mean(final[-10:])
     ini_l = capacidade_tanque * (ini_pct / 100)
     fim_l = capacidade_tanque * (fim_pct / 100)
     consumo = max(ini_l - fim_l, 0)
@@ -109,15 +199,15 @@ def analisar_fuellvl(df: pd.DataFrame, capacidade_tanque=55.0):
 # =========================
 # Análise principal por coluna
 # =========================
-def analisar(df: pd.DataFrame, modelo=None, combustivel=None, valores_ideais=None) -> dict:
+def analisar(df: pd.DataFrame, modelo=None, combustivel=None, valores_ideais=None, faixas=None) -> dict:
     resultado = {}
 
-    # 1️⃣ Limpeza global: substitui "-" por NaN
-    df = df.replace("-", np.nan)
+    # "-" (leitura vazia) é tratado por coluna: pd.to_numeric(errors='coerce')
+    # nas numéricas e percentual_valores nas categóricas, sem copiar o df inteiro
 
     # ---- 1. Tempo da viagem
     if "time(ms)" in df.columns:
-        tempo = pd.to_numeric(df["time(ms)"], errors='coerce').dropna()
+        tempo = _numerica(df["time(ms)"])
         if not tempo.empty:
             total_segundos = tempo.max() / 1000
             h, m, s = int(total_segundos // 3600), int((total_segundos % 3600) // 60), int(total_segundos % 60)
@@ -127,222 +217,40 @@ def analisar(df: pd.DataFrame, modelo=None, combustivel=None, valores_ideais=Non
     else:
         resultado["time(ms)"] = {"mensagem": "Coluna ausente"}
 
-    # ---- 2. IC_SPDMTR(km/h)
-    if "IC_SPDMTR(km/h)" in df.columns:
-        resultado["IC_SPDMTR(km/h)"] = estatisticas(df["IC_SPDMTR(km/h)"])
-    else:
-        resultado["IC_SPDMTR(km/h)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 3. RPM(1/min)
-    if "RPM(1/min)" in df.columns:
-        resultado["RPM(1/min)"] = estatisticas(df["RPM(1/min)"])
-    else:
-        resultado["RPM(1/min)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 4. ODOMETER(km)
-    if "ODOMETER(km)" in df.columns:
-        col = pd.to_numeric(df["ODOMETER(km)"], errors='coerce').dropna()
-        if not col.empty:
-            ini = col.min()
-            fim = col.max()
-            resultado["ODOMETER(km)"] = {
-                "Início (km)": arredondar_seguro(ini),
-                "Fim (km)": arredondar_seguro(fim),
-                "Distância (km)": arredondar_seguro(fim - ini) if pd.notna(fim) and pd.notna(ini) else None
-            }
-        else:
-            resultado["ODOMETER(km)"] = {"mensagem": "Sem dados numéricos válidos"}
-    else:
-        resultado["ODOMETER(km)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 5. TRIP_ODOM(km)
-    if "TRIP_ODOM(km)" in df.columns:
-        col = pd.to_numeric(df["TRIP_ODOM(km)"], errors='coerce').dropna()
+    # ---- 2. Odômetros (início, fim e distância)
+    for coluna in ("ODOMETER(km)", "TRIP_ODOM(km)"):
+        if coluna not in df.columns:
+            continue
+        col = _numerica(df[coluna])
         if not col.empty:
-            ini = col.min()
-            fim = col.max()
-            resultado["TRIP_ODOM(km)"] = {
+            arr = col.to_numpy(dtype=np.float64, copy=False)
+            ini, fim = arr.min(), arr.max()
+            resultado[coluna] = {
                 "Início (km)": arredondar_seguro(ini),
                 "Fim (km)": arredondar_seguro(fim),
-                "Distância (km)": arredondar_seguro(fim - ini) if pd.notna(fim) and pd.notna(ini) else None
+                "Distância (km)": arredondar_seguro(fim - ini)  # NaN já vira None
             }
         else:
-            resultado["TRIP_ODOM(km)"] = {"mensagem": "Sem dados numéricos válidos"}
-    else:
-        resultado["TRIP_ODOM(km)"] = {"mensagem": "Coluna ausente"}
+            resultado[coluna] = {"mensagem": "Sem dados numéricos válidos"}
 
-    # ---- 6. ENGI_IDLE
-    if "ENGI_IDLE" in df.columns:
-        resultado["ENGI_IDLE"] = percentual_valores(df["ENGI_IDLE"], ["SIM", "NÃO"])
-    else:
-        resultado["ENGI_IDLE"] = {"mensagem": "Coluna ausente"}
+    # ---- 3. Campos categóricos (percentual de cada valor esperado)
+    for coluna, esperados in CAMPOS_CATEGORICOS.items():
+        if coluna in df.columns:
+            resultado[coluna] = percentual_valores(df[coluna], esperados)
 
-    # ---- 7. OPENLOOP
-    if "OPENLOOP" in df.columns:
-        resultado["OPENLOOP"] = percentual_valores(df["OPENLOOP"], ["ON", "OFF"])
-    else:
-        resultado["OPENLOOP"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 8. ENG_STAB
-    if "ENG_STAB" in df.columns:
-        resultado["ENG_STAB"] = percentual_valores(df["ENG_STAB"], ["SIM", "NÃO"])
-    else:
-        resultado["ENG_STAB"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 9. FUELLVL(%)
+    # ---- 4. FUELLVL(%)
     resultado["FUELLVL(%)"] = analisar_fuellvl(df)
 
-    # ---- 10. FUELPW(ms)
-    if "FUELPW(ms)" in df.columns:
-        resultado["FUELPW(ms)"] = estatisticas(df["FUELPW(ms)"])
-    else:
-        resultado["FUELPW(ms)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 11. FUEL_CORR(:1)
-    if "FUEL_CORR(:1)" in df.columns:
-        serie = df["FUEL_CORR(:1)"]
-        resultado["FUEL_CORR(:1)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["FUEL_CORR(:1)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 12. SHRTFT1(%)
-    if "SHRTFT1(%)" in df.columns:
-        serie = df["SHRTFT1(%)"]
-        resultado["SHRTFT1(%)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["SHRTFT1(%)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 13. LONGFT1(%)
-    if "LONGFT1(%)" in df.columns:
-        serie = df["LONGFT1(%)"]
-        resultado["LONGFT1(%)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["LONGFT1(%)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 14. AF_RATIO(:1)
-    if "AF_RATIO(:1)" in df.columns:
-        serie = df["AF_RATIO(:1)"]
-        resultado["AF_RATIO(:1)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["AF_RATIO(:1)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 15. LMD_EGO1(:1)
-    if "LMD_EGO1(:1)" in df.columns:
-        serie = df["LMD_EGO1(:1)"]
-        resultado["LMD_EGO1(:1)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["LMD_EGO1(:1)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 16. O2S11_V(V)
-    if "O2S11_V(V)" in df.columns:
-        resultado["O2S11_V(V)"] = estatisticas(df["O2S11_V(V)"])
-    else:
-        resultado["O2S11_V(V)"] = {"mensagem": "Coluna ausente"}
+    # ---- 5. Campos numéricos: todas as estatísticas em um único lote
+    # (convertidos uma vez; estatísticas e top 3 reaproveitam o mesmo bloco)
+    numericos = bloco_numerico(df[[c for c in CAMPOS_NUMERICOS if c in df.columns]])
+    for coluna, estat in estatisticas_lote(numericos).items():
+        if coluna in CAMPOS_TOP3:
+            estat = {**estat, "Top 3 valores": top3_frequentes(numericos[coluna])}
+        resultado[coluna] = estat
 
-    # ---- 17. ECT_GAUGE(°C)
-    if "ECT_GAUGE(°C)" in df.columns:
-        resultado["ECT_GAUGE(°C)"] = estatisticas(df["ECT_GAUGE(°C)"])
-    else:
-        resultado["ECT_GAUGE(°C)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 18. ECT(°C)
-    if "ECT(°C)" in df.columns:
-        resultado["ECT(°C)"] = estatisticas(df["ECT(°C)"])
-    else:
-        resultado["ECT(°C)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 19. IAT(°C)
-    if "IAT(°C)" in df.columns:
-        resultado["IAT(°C)"] = estatisticas(df["IAT(°C)"])
-    else:
-        resultado["IAT(°C)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 20. MAP(V)
-    if "MAP(V)" in df.columns:
-        serie = df["MAP(V)"]
-        resultado["MAP(V)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["MAP(V)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 21. MAP.OBDII(kPa)
-    if "MAP.OBDII(kPa)" in df.columns:
-        serie = df["MAP.OBDII(kPa)"]
-        resultado["MAP.OBDII(kPa)"] = {
-            **estatisticas(serie),
-            "Top 3 valores": top3_frequentes(serie)
-        }
-    else:
-        resultado["MAP.OBDII(kPa)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 22. MIXCNT_STAT
-    if "MIXCNT_STAT" in df.columns:
-        resultado["MIXCNT_STAT"] = percentual_valores(df["MIXCNT_STAT"], ["ABERTO", "FECHADO"])
-    else:
-        resultado["MIXCNT_STAT"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 23. LAMBDA_1
-    if "LAMBDA_1" in df.columns:
-        resultado["LAMBDA_1"] = percentual_valores(df["LAMBDA_1"], ["LEAN MIX", "RICH MIX", "ETC"])
-    else:
-        resultado["LAMBDA_1"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 24-27. SPKDUR_1 a SPKDUR_4
-    for i in range(1, 5):
-        nome = f"SPKDUR_{i}(ms)"
-        if nome in df.columns:
-            resultado[nome] = estatisticas(df[nome])
-        else:
-            resultado[nome] = {"mensagem": "Coluna ausente"}
-
-    # ---- 28. VBAT_1(V)
-    if "VBAT_1(V)" in df.columns:
-        resultado["VBAT_1(V)"] = estatisticas(df["VBAT_1(V)"])
-    else:
-        resultado["VBAT_1(V)"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 29. BRK_LVL
-    if "BRK_LVL" in df.columns:
-        resultado["BRK_LVL"] = percentual_valores(df["BRK_LVL"], ["ALTO", "MÉDIO", "BAIXO"])
-    else:
-        resultado["BRK_LVL"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 30. PSP
-    if "PSP" in df.columns:
-        resultado["PSP"] = percentual_valores(df["PSP"], ["HIGH", "MEDIUM", "LOW"])
-    else:
-        resultado["PSP"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 31. FANLO
-    if "FANLO" in df.columns:
-        resultado["FANLO"] = estatisticas(df["FANLO"])
-    else:
-        resultado["FANLO"] = {"mensagem": "Coluna ausente"}
-
-    # ---- 32. FANHI
-    if "FANHI" in df.columns:
-        resultado["FANHI"] = estatisticas(df["FANHI"])
-    else:
-        resultado["FANHI"] = {"mensagem": "Coluna ausente"}
-
-    return resultado
+    # Campos ausentes e ordem fixa de exibição
+    return {c: resultado.get(c, {"mensagem": "Coluna ausente"}) for c in ORDEM_RESUMO}
 
 # =========================
 # Exibição no Streamlit
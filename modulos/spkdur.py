@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.utilitarios import sanitizar_colunas, calcular_estatisticas_lote, avaliar_status
+from modulos.valores_ideais import obter_faixas
 
 COLUNAS_SPK = ["SPKDUR_1(ms)", "SPKDUR_2(ms)", "SPKDUR_3(ms)", "SPKDUR_4(ms)"]
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa os tempos de centelha (spark duration) dos 4 cilindros.
     Identifica variações anormais e avalia consistência entre cilindros.
@@ -14,18 +16,18 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
     status_geral = "OK"
     mensagens = []
 
+    # Sanitização e estatísticas de todas as colunas em lote
+    series = sanitizar_colunas(df, COLUNAS_SPK)
+    estatisticas = calcular_estatisticas_lote(series)
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
+
     # Loop pelos 4 cilindros
     for coluna in COLUNAS_SPK:
-        serie = sanitizar_coluna(df, coluna)
-        estat = calcular_estatisticas(serie)
+        estat = estatisticas[coluna]
 
         # Obtém faixa ideal do JSON, se existir
-        faixa_ideal = (
-            valores_ideais
-            .get(modelo, {})
-            .get(combustivel, {})
-            .get(coluna, {})
-        )
+        faixa_ideal = faixas.get(coluna, {})
         status = avaliar_status(estat["média"], faixa_ideal)
 
         if status == "Alerta":
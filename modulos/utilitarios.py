@@ -1,6 +1,32 @@
+import math
+import numbers
+import weakref
 import pandas as pd
 import numpy as np
 
+# Colunas já sanitizadas, indexadas pelo id do DataFrame de origem.
+# A entrada é descartada automaticamente quando o DataFrame é coletado.
+_CACHE_SANITIZADO: dict[int, dict[str, pd.Series]] = {}
+
+# Estatísticas já calculadas, indexadas pelo id da série. Como as séries
+# sanitizadas são compartilhadas entre módulos, uma coluna consultada por
+# vários analisadores (LAMBDA_1, AF_RATIO, SHRTFT1...) é agregada uma vez só.
+_CACHE_ESTATISTICAS: dict[int, dict] = {}
+
+def _cache_do_dataframe(df: pd.DataFrame) -> dict:
+    chave = id(df)
+    cache = _CACHE_SANITIZADO.get(chave)
+    if cache is None:
+        cache = _CACHE_SANITIZADO[chave] = {}
+        weakref.finalize(df, _CACHE_SANITIZADO.pop, chave, None)
+    return cache
+
+def _memorizar_estatisticas(serie: pd.Series, estat: dict) -> None:
+    chave = id(serie)
+    if chave not in _CACHE_ESTATISTICAS:
+        weakref.finalize(serie, _CACHE_ESTATISTICAS.pop, chave, None)
+    _CACHE_ESTATISTICAS[chave] = estat
+
 def sanitizar_coluna(df: pd.DataFrame, coluna: str) -> pd.Series:
     """
     Limpa e converte uma coluna para valores numéricos:
@@ -8,33 +34,121 @@ def sanitizar_coluna(df: pd.DataFrame, coluna: str) -> pd.Series:
     - Converte para float
     - Substitui valores inválidos por NaN
     - Retorna série sem NaN
+
+    O resultado é memorizado por DataFrame, então cada coluna é convertida
+    uma única vez mesmo quando vários módulos a consultam. A série retornada
+    é compartilhada e não deve ser modificada in-place.
     """
     if coluna not in df.columns:
         return pd.Series([], dtype=float)
 
-    serie = df[coluna].astype(str)
+    cache = _cache_do_dataframe(df)
+    if coluna not in cache:
+        cache[coluna] = _converter_numerico(df[coluna])
+    return cache[coluna]
+
+def sanitizar_colunas(df: pd.DataFrame, colunas) -> dict[str, pd.Series]:
+    """
+    Versão em lote de sanitizar_coluna: as colunas de texto ainda não
+    convertidas são empilhadas e a limpeza das strings roda uma única vez.
+    Retorna {coluna: série}, com série vazia para colunas ausentes.
+    """
+    cache = _cache_do_dataframe(df)
+    pendentes = [
+        c for c in dict.fromkeys(colunas)
+        if c in df.columns and c not in cache
+        and not pd.api.types.is_numeric_dtype(df[c])
+    ]
+    if len(pendentes) > 1:
+        texto = _limpar_texto(pd.concat([df[c] for c in pendentes], keys=pendentes))
+        # Fatias por posição (não .loc pela chave): uma coluna sem nenhum valor
+        # válido, ou um CSV só com cabeçalho, não deixa linhas para a sua chave.
+        # Os códigos do 1º nível seguem a ordem de `pendentes`, então os limites
+        # de cada coluna saem de um searchsorted
+        limites = np.searchsorted(texto.index.codes[0], np.arange(len(pendentes) + 1))
+        for i, c in enumerate(pendentes):
+            # pd.to_numeric por coluna para manter o dtype que cada uma teria sozinha
+            fatia = texto.iloc[limites[i]:limites[i + 1]].droplevel(0).rename(c)
+            cache[c] = _converter_numerico(fatia, limpo=True)
+
+    return {c: sanitizar_coluna(df, c) for c in colunas}
+
+def _converter_numerico(serie: pd.Series, limpo: bool = False) -> pd.Series:
+    # Coluna já numérica (caso comum vindo do CSV): basta descartar os NaN,
+    # sem o caminho lento via texto + pd.to_numeric
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.dropna()
+    if not pd.api.types.is_float_dtype(serie):
+        # Converte para numérico e remove NaN (limpo=True: texto já passou por _limpar_texto)
+        serie = pd.to_numeric(serie if limpo else _limpar_texto(serie), errors='coerce').dropna()
+        if pd.api.types.is_integer_dtype(serie):
+            return serie
+
+    # Floats em float64: em float32 os arredondamentos de exibição mudariam
+    # em empates como 0.985
+    return serie.dropna().astype(np.float64, copy=False)
+
+# Leituras vazias/inválidas comuns nos logs; descartadas antes das operações de texto
+TOKENS_INVALIDOS = frozenset(("-", "", "NA", "N/A", "NaN", "nan", "None", "NaT"))
+
+def _limpar_texto(serie: pd.Series) -> pd.Series:
+    # Nulos e tokens inválidos saem por uma busca em hashtable (isin) antes
+    # das operações de string; pd.to_numeric descartaria essas linhas de
+    # qualquer forma, então o resultado não muda
+    serie = serie[serie.notna() & ~serie.isin(TOKENS_INVALIDOS)].astype(str)
 
     # Remove espaços e símbolos comuns
-    serie = (
+    return (
         serie
         .str.strip()
         .str.replace(',', '.', regex=False)    # vírgula -> ponto
         .str.replace('%', '', regex=False)     # remove porcentagem
     )
 
-    # Substitui strings conhecidas inválidas por NaN
-    serie = serie.replace(['', '-', 'nan', 'None', 'NaT'], pd.NA)
-
-    # Converte para numérico e remove NaN
-    serie = pd.to_numeric(serie, errors='coerce').dropna()
+def calcular_quantis(arr: np.ndarray, quantis) -> np.ndarray:
+    """
+    Calcula vários quantis (interpolação linear, como o pandas) com uma
+    única seleção parcial (np.partition) em vez de ordenar o array inteiro.
+    Espera um array sem NaN e não vazio.
+    """
+    posicoes = np.asarray(quantis, dtype=np.float64) * (arr.size - 1)
+    baixo = np.floor(posicoes).astype(np.intp)
+    alto = np.ceil(posicoes).astype(np.intp)
+    particionado = np.partition(arr, np.union1d(baixo, alto))
+    return particionado[baixo] + (particionado[alto] - particionado[baixo]) * (posicoes - baixo)
 
-    return serie
+def mais_frequentes(arr: np.ndarray, k: int = 3) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Os `k` valores mais frequentes de `arr` (sem NaN) e as suas contagens, do
+    mais para o menos frequente; floats são arredondados em 2 casas antes da
+    contagem. np.unique + seleção parcial: só os maiores contadores são
+    ordenados, e empates seguem a ordem da primeira ocorrência, como no
+    value_counts.
+    """
+    if arr.dtype.kind == "f":
+        arr = np.round(arr.astype(np.float64, copy=False), 2)
+    valores, primeira, contagens = np.unique(arr, return_index=True, return_counts=True)
+    k = min(k, contagens.size)
+    if k == 0:
+        return valores, contagens
+    corte = np.partition(contagens, contagens.size - k)[contagens.size - k]
+    candidatos = np.flatnonzero(contagens >= corte)
+    ordem = candidatos[np.lexsort((primeira[candidatos], -contagens[candidatos]))][:k]
+    return valores[ordem], contagens[ordem]
 
 def calcular_estatisticas(serie: pd.Series) -> dict:
     """
     Retorna um dicionário com estatísticas básicas de uma série numérica.
+    Mediana e quartis saem de uma única np.partition (O(n)) em vez de três
+    quantis do pandas. O resultado é memorizado por série (cópia devolvida).
     """
-    if serie.empty:
+    memorizado = _CACHE_ESTATISTICAS.get(id(serie))
+    if memorizado is not None:
+        return dict(memorizado)
+
+    arr = serie.to_numpy(dtype=np.float64, copy=False)
+    arr = arr[~np.isnan(arr)]  # NaN removido uma única vez
+    if arr.size == 0:
         return {
             "média": None,
             "mínimo": None,
@@ -45,15 +159,86 @@ def calcular_estatisticas(serie: pd.Series) -> dict:
             "q3": None
         }
 
-    return {
-        "média": round(serie.mean(), 2),
-        "mínimo": round(serie.min(), 2),
-        "máximo": round(serie.max(), 2),
-        "mediana": round(serie.median(), 2),
-        "desvio_padrao": round(serie.std(), 2),
-        "q1": round(serie.quantile(0.25), 2),
-        "q3": round(serie.quantile(0.75), 2)
+    q1, mediana, q3 = calcular_quantis(arr, [0.25, 0.5, 0.75])
+    if pd.api.types.is_integer_dtype(serie):
+        minimo, maximo = serie.min(), serie.max()
+    else:
+        minimo, maximo = arr.min(), arr.max()
+    desvio = arr.std(ddof=1) if arr.size > 1 else np.nan
+    estat = {
+        "média": round(arr.mean(), 2),
+        "mínimo": round(minimo, 2),
+        "máximo": round(maximo, 2),
+        "mediana": round(mediana, 2),
+        "desvio_padrao": round(desvio, 2),
+        "q1": round(q1, 2),
+        "q3": round(q3, 2)
+    }
+    _memorizar_estatisticas(serie, estat)
+    return dict(estat)
+
+def calcular_estatisticas_lote(series: dict[str, pd.Series]) -> dict[str, dict]:
+    """
+    Mesmo resultado de calcular_estatisticas para várias séries de uma vez:
+    as séries viram colunas de um único DataFrame e média/mín/máx/desvio e
+    os três quantis saem de duas agregações em bloco em vez de uma por série.
+    Séries vazias ou já agregadas antes (cache por série) ficam fora do bloco.
+    """
+    prontas = {
+        nome: calcular_estatisticas(serie) for nome, serie in series.items()
+        if serie.empty or id(serie) in _CACHE_ESTATISTICAS
     }
+    bloco = pd.DataFrame(
+        {nome: serie.astype(np.float64) for nome, serie in series.items() if nome not in prontas}
+    )
+    if bloco.empty:
+        return prontas
+
+    agregado = bloco.agg(["mean", "min", "max", "std"])
+    quantis = bloco.quantile([0.25, 0.5, 0.75])
+    resultado = {}
+    for nome in series:
+        if nome in prontas:
+            resultado[nome] = prontas[nome]
+            continue
+        a, q = agregado[nome], quantis[nome]
+        minimo, maximo = a["min"], a["max"]
+        if pd.api.types.is_integer_dtype(series[nome]):
+            # como em calcular_estatisticas: colunas inteiras mantêm mín/máx inteiros
+            minimo, maximo = series[nome].min(), series[nome].max()
+        estat = {
+            "média": round(a["mean"], 2),
+            "mínimo": round(minimo, 2),
+            "máximo": round(maximo, 2),
+            "mediana": round(q[0.5], 2),
+            "desvio_padrao": round(a["std"], 2),
+            "q1": round(q[0.25], 2),
+            "q3": round(q[0.75], 2)
+        }
+        _memorizar_estatisticas(series[nome], estat)
+        resultado[nome] = dict(estat)
+    return resultado
+
+def tabela_estatisticas(grupo: dict[str, dict], status: dict[str, str] | None = None) -> pd.DataFrame:
+    """
+    Média/mínimo/máximo de vários parâmetros em uma tabela, um por linha,
+    para exibir com um único st.dataframe em vez de um st.metric por valor.
+    Sem `status`, só entram os parâmetros com dados; com `status`, entram
+    todos os parâmetros de `status`, com a coluna "Status" à frente.
+    """
+    linhas = {nome: stats for nome, stats in grupo.items() if stats.get("média") is not None}
+    tabela = pd.DataFrame.from_dict(linhas, orient="index", columns=["média", "mínimo", "máximo"])
+    tabela = tabela.rename(columns={"média": "Média", "mínimo": "Mín", "máximo": "Máx"})
+    if status is not None:
+        tabela = tabela.reindex(list(status))
+        tabela.insert(0, "Status", list(status.values()))
+    return tabela
+
+def formatar_valor(valor, formato: str = ".2f") -> str:
+    """Formata um número para exibição; None, NaN, inf e não numéricos viram "N/A"."""
+    if isinstance(valor, numbers.Real) and math.isfinite(valor):
+        return format(valor, formato)
+    return "N/A"
 
 def avaliar_status(media: float, faixa_ideal: dict) -> str:
     """
@@ -1,12 +1,19 @@
-import json
+import orjson
 
 def carregar_valores_ideais(caminho_arquivo="valores_ideais.json"):
     try:
-        with open(caminho_arquivo, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(caminho_arquivo, "rb") as f:
+            return orjson.loads(f.read())
     except Exception as e:
         raise RuntimeError(f"Erro ao carregar o arquivo de valores ideais: {e}")
 
+def obter_faixas(valores_ideais: dict, modelo: str, combustivel: str) -> dict:
+    """
+    Retorna as faixas ideais de um modelo/combustível (ou {} se não houver).
+    O app resolve isso uma única vez e repassa o resultado a cada módulo.
+    """
+    return valores_ideais.get(modelo.lower(), {}).get(combustivel.lower(), {})
+
 def obter_valores_para_modelo(modelo: str, combustivel: str, valores_ideais: dict):
     modelo = modelo.lower().strip()
     combustivel = combustivel.lower().strip()
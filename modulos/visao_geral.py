@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from modulos.utilitarios import sanitizar_coluna, calcular_estatisticas, avaliar_status
+from modulos.utilitarios import sanitizar_colunas, calcular_estatisticas_lote, avaliar_status, formatar_valor
+from modulos.valores_ideais import obter_faixas
 
 # Descrições breves dos campos
 DESCRICOES = {
@@ -18,7 +19,8 @@ def calcular_proporcao_dentro_faixa(serie: pd.Series, faixa: dict) -> float:
     proporcao = len(dentro) / len(serie) if len(serie) > 0 else 0.0
     return proporcao
 
-def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict) -> dict:
+def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: dict,
+             faixas: dict | None = None) -> dict:
     """
     Analisa os campos da visão geral da viagem:
     - descrição breve de cada campo,
@@ -33,15 +35,21 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
         "valores": {}
     }
     mensagens = []
+    if faixas is None:
+        faixas = obter_faixas(valores_ideais, modelo, combustivel)
+
+    # Sanitização e estatísticas de todos os campos em lote
+    series = sanitizar_colunas(df, campos)
+    estatisticas = calcular_estatisticas_lote(series)
 
     for campo in campos:
-        serie = sanitizar_coluna(df, campo)
-        estat = calcular_estatisticas(serie)
+        serie = series[campo]
+        estat = estatisticas[campo]
 
         # Obter faixa ideal do JSON, se disponível
         faixa_ideal = None
         try:
-            faixa = valores_ideais.get(modelo.lower(), {}).get(combustivel.lower(), {}).get(campo)
+            faixa = faixas.get(campo)
             if faixa and isinstance(faixa, list) and len(faixa) == 2:
                 faixa_ideal = {"min": faixa[0], "max": faixa[1]}
         except Exception:
@@ -54,8 +62,7 @@ def analisar(df: pd.DataFrame, modelo: str, combustivel: str, valores_ideais: di
         if status == "Alerta":
             resultado["status"] = "Alerta"
 
-        media_val = estat.get('média')
-        media_str = f"{media_val:.2f}" if isinstance(media_val, (int, float)) else "N/A"
+        media_str = formatar_valor(estat.get('média'))
         
         mensagem_campo = (
             f"{campo}: {DESCRICOES.get(campo, '')} "
@@ -1,6 +1,9 @@
 import pandas as pd
+import numpy as np
 from datetime import timedelta
 
+MAPA_ENGI_IDLE = {"Sim": 1, "Não": 0, "Nao": 0, "nao": 0, "não": 0}
+
 def converter_tempo(ms):
     try:
         segundos = int(ms) // 1000
@@ -8,6 +11,36 @@ def converter_tempo(ms):
     except:
         return "Inválido"
 
+def converter_tempo_serie(ms: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de converter_tempo para uma coluna inteira: dias, horas,
+    minutos e segundos saem de aritmética inteira do NumPy, sem uma chamada
+    Python por linha. O texto é o mesmo de str(timedelta) ("1 day, 1:00:00",
+    "-1 day, 23:59:59") e, como int(ms), só texto de número inteiro é aceito
+    ("1.5" vira "Inválido") e floats são truncados.
+    """
+    valores = pd.to_numeric(ms, errors="coerce")
+    if ms.dtype == object:
+        try:
+            valores = valores.mask(ms.str.fullmatch(r"\s*[+-]?\d+\s*").eq(False))
+        except AttributeError:
+            pass  # coluna object sem nenhum texto
+    valores = valores.dropna()
+    if pd.api.types.is_float_dtype(valores):
+        valores = np.trunc(valores[np.isfinite(valores) & (valores.abs() < 2**63)])
+    s = valores.astype(np.int64) // 1000
+    dias, resto = s // 86400, s % 86400
+    limite = dias.abs() <= 999999999  # faixa do timedelta
+    dias, resto = dias[limite], resto[limite]
+    texto = (
+        (resto // 3600).astype(str)
+        + ":" + (resto % 3600 // 60).astype(str).str.zfill(2)
+        + ":" + (resto % 60).astype(str).str.zfill(2)
+    )
+    sufixo = pd.Series(np.where(dias.abs() == 1, " day, ", " days, "), index=dias.index)
+    texto = texto.mask(dias != 0, dias.astype(str) + sufixo + texto)
+    return texto.reindex(ms.index, fill_value="Inválido")
+
 def carregar_e_processar_csv(arquivo_csv):
     # Leitura inicial (tentando encoding e separador mais comum)
     df = pd.read_csv(arquivo_csv, encoding='utf-8', sep=';', skip_blank_lines=True)
@@ -23,15 +56,16 @@ def carregar_e_processar_csv(arquivo_csv):
         raise Exception("Colunas obrigatórias não encontradas: 'time(ms)' ou 'ENGI_IDLE'.")
 
     # Coluna de tempo convertida (opcional, útil para visualizações)
-    df["TIME_CONVERTED"] = df["time(ms)"].apply(converter_tempo)
+    df["TIME_CONVERTED"] = converter_tempo_serie(df["time(ms)"])
 
-    # Trata ENGI_IDLE (categorias inconsistentes)
-    df["ENGI_IDLE"] = df["ENGI_IDLE"].replace({
-        "Sim": 1, "Não": 0, "Nao": 0, "nao": 0, "não": 0
-    }).fillna(0).astype(int)
+    # Trata ENGI_IDLE (categorias inconsistentes): o mapeamento roda só sobre os
+    # valores distintos e é espalhado pelos códigos; NaN (código -1) vira 0
+    codigos, distintos = pd.factorize(df["ENGI_IDLE"])
+    valores = np.array([MAPA_ENGI_IDLE.get(v, v) for v in distintos] + [0], dtype=object)
+    df["ENGI_IDLE"] = pd.Series(valores[codigos], index=df.index).astype(int)
 
     # Cria uma coluna "ativa" com base no funcionamento do motor
-    df["ACTIVE"] = df["ENGI_IDLE"].apply(lambda x: 0 if x == 1 else 1)
+    df["ACTIVE"] = (df["ENGI_IDLE"] != 1).astype(int)
 
     # Limpa e converte todas as colunas numéricas que têm "-" ou strings
     for col in df.columns: